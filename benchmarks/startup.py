@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Measure how long web-check takes to start for commands that shouldn't need
+the network, and which heavy dependencies each one ends up importing.
+
+Run from the repository root:
+    python3 benchmarks/startup.py [runs]
+"""
+import os
+import sys
+import time
+import tempfile
+import statistics
+import subprocess
+
+heavy_modules = ('requests', 'html2text', 'sqlalchemy', 'difflib')
+
+def time_command(args, runs):
+    """
+    Input arguments for web-check and a number of runs.  Returns the fastest and
+    median wall clock time in milliseconds.
+    """
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-m', 'web_check'] + args,
+                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return min(timings), statistics.median(timings)
+
+def imported_modules(args):
+    """
+    Input arguments for web-check.  Returns the heavy modules that were
+    imported by the time it exited.
+    """
+    code = """import sys, atexit
+atexit.register(lambda: sys.__stderr__.write(' '.join(
+    m for m in {!r} if m in sys.modules)))
+sys.argv = ['web-check'] + {!r}
+from web_check.cli import main
+main()
+""".format(heavy_modules, args)
+    result = subprocess.run([sys.executable, '-c', code],
+                        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                        universal_newlines=True)
+    return result.stderr.strip().splitlines()[-1:] or ['']
+
+if __name__ == '__main__':
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    database = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    commands = (
+        [],
+        ['--help'],
+        ['--list', '--database-location', database],
+        ['--delete', 'md5', 'http://example.com',
+            '--database-location', database],
+    )
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', 'pass'])
+    print('python startup: {:.1f}ms'.format(
+                                    (time.perf_counter() - start) * 1000))
+    for args in commands:
+        fastest, median = time_command(args, runs)
+        print('{: <30} min {:7.1f}ms  median {:7.1f}ms  imports: {}'.format(
+                                    ' '.join(args[:2]) or '(no arguments)',
+                                    fastest, median,
+                                    imported_modules(args)[0] or 'none'))
@@ -0,0 +1,7 @@
+"""
+A tool to periodicaly monitor given webpages
+
+Nothing heavy is imported here so that the command line can start quickly,
+requests, html2text and SQLAlchemy are only loaded by the modules that need
+them.
+"""
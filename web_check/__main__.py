@@ -0,0 +1,3 @@
+from web_check.cli import main
+
+main()
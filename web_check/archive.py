@@ -0,0 +1,91 @@
+import os
+import gzip
+import json
+import shutil
+import datetime
+import tempfile
+from contextlib import contextmanager
+
+from web_check.fingerprint import fingerprint
+
+def archive_path(directory, url):
+    """Returns the file a url's response is archived in"""
+    return os.path.join(directory, '{}.gz'.format(
+                                fingerprint(url.encode('utf-8'), 'blake2b')))
+
+class RecordArchive(object):
+    """
+    Saves every response fetched during a run to directory.
+
+    Each url gets a gzip file holding one line of json with the status,
+    headers, encoding and latency followed by the body exactly as received.
+    A later fetch of the same url replaces it.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def save(self, url, response):
+        metadata = {'url': url,
+                'status': response.status_code,
+                'headers': dict(response.headers),
+                'encoding': response.encoding,
+                'elapsed': response.elapsed.total_seconds()}
+        with gzip.open(archive_path(self.directory, url), 'wb') as f:
+            f.write(json.dumps(metadata).encode('utf-8'))
+            f.write(b'\n')
+            f.write(response.content)
+
+class NotRecorded(Exception):
+    """Raised when replaying a url that has no recorded response"""
+
+class ReplayArchive(object):
+    """
+    Serves responses saved by a RecordArchive instead of using the network.
+    """
+    def __init__(self, directory):
+        if not os.path.isdir(directory):
+            raise IOError('No archive at {}'.format(directory))
+        self.directory = directory
+
+    def get(self, url):
+        """
+        Input a url.  Returns a requests.Response rebuilt from the archive.
+
+        Raises NotRecorded if the url wasn't recorded, which says nothing
+        about the host so it mustn't be handled as a failed fetch.
+        """
+        import requests
+        from requests.structures import CaseInsensitiveDict
+        try:
+            with gzip.open(archive_path(self.directory, url), 'rb') as f:
+                metadata = json.loads(f.readline().decode('utf-8'))
+                body = f.read()
+        except (IOError, OSError):
+            raise NotRecorded('No recorded response for {}'.format(url))
+
+        response = requests.models.Response()
+        response.url = url
+        response.status_code = metadata['status']
+        response.headers = CaseInsensitiveDict(metadata['headers'])
+        response.encoding = metadata['encoding']
+        response.elapsed = datetime.timedelta(seconds=metadata['elapsed'])
+        response._content = body
+        return response
+
+@contextmanager
+def scratch_database(database_location):
+    """
+    Yields the location of a temporary copy of a sqlite database, deleted
+    once the with block ends, so a replayed run can update checks as usual
+    without touching the real ones.
+    """
+    directory = tempfile.mkdtemp()
+    try:
+        location = os.path.join(directory, 'replay.db')
+        if os.path.exists(database_location):
+            shutil.copyfile(database_location, location)
+        yield location
+    finally:
+        shutil.rmtree(directory)
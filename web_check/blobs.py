@@ -0,0 +1,68 @@
+from collections import Counter
+
+from sqlalchemy import func
+
+from web_check.fingerprint import fingerprint
+from web_check.models import ContentBlob
+
+# Blob keys must not collide, so they always use a cryptographic hash rather
+# than the configurable check fingerprint
+blob_algorithm = 'blake2b'
+
+def content_key(text):
+    """Input extracted text.  Returns the key it is stored under"""
+    return fingerprint(text.encode('utf-8'), blob_algorithm)
+
+def store_content(session, text, key=None):
+    """
+    Input extracted text.  Adds a reference to its blob, creating it if no
+    other check has the same content.  Returns the blob's key.
+    """
+    if key is None:
+        key = content_key(text)
+    if not session.query(ContentBlob).filter(ContentBlob.key == key).update(
+                            {ContentBlob.refcount: ContentBlob.refcount + 1},
+                            synchronize_session=False):
+        session.add(ContentBlob(key=key, content=text, refcount=1))
+        session.flush()
+
+    return key
+
+def release_content(session, keys):
+    """
+    Input the blob keys of changed or deleted content, a key may be repeated
+    once per reference being dropped.  Blobs left without references are
+    deleted.
+    """
+    counts = Counter(key for key in keys if key)
+    if not counts:
+        return
+
+    for key, count in counts.items():
+        session.query(ContentBlob).filter(ContentBlob.key == key).update(
+                            {ContentBlob.refcount: ContentBlob.refcount - count},
+                            synchronize_session=False)
+
+    session.query(ContentBlob).filter(ContentBlob.key.in_(list(counts)),
+                    ContentBlob.refcount <= 0).delete(synchronize_session=False)
+
+def release_matching_content(session, column, conditions):
+    """
+    Input a content_hash column and the conditions selecting rows about to be
+    deleted.  Releases their references with one correlated UPDATE rather
+    than one per key, then deletes blobs left without references.
+    """
+    references = session.query(func.count(column)).filter(
+                        column == ContentBlob.key, *conditions).correlate(
+                                                    ContentBlob).as_scalar()
+    keys = session.query(column).filter(*conditions).statement
+    session.query(ContentBlob).filter(ContentBlob.key.in_(keys)).update(
+                    {ContentBlob.refcount: ContentBlob.refcount - references},
+                    synchronize_session=False)
+    session.query(ContentBlob).filter(ContentBlob.refcount <= 0).delete(
+                                                synchronize_session=False)
+
+def get_content(session, key):
+    """Returns the text stored under key"""
+    return session.query(ContentBlob.content).filter(
+                                            ContentBlob.key == key).scalar()
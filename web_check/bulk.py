@@ -0,0 +1,166 @@
+import re
+
+from sqlalchemy import func, or_
+
+from web_check.blobs import release_matching_content
+from web_check.history import check_type_ids
+from web_check.models import check_models, paused_run_after, DiffCheck, \
+    SiteCheck, SitePage, CheckHistory
+
+check_statuses = ('active', 'paused', 'failing', 'ok')
+
+def get_models(check_types=None):
+    """
+    Input a list of check types, None for every type.  Returns their models.
+    Raises ValueError for an unknown type.
+    """
+    if not check_types:
+        return check_models
+
+    models = dict((model.check_type, model) for model in check_models)
+    try:
+        return tuple(models[check_type] for check_type in check_types)
+    except KeyError as e:
+        raise ValueError('Unknown check type {}, choose from {}'.format(
+                        e.args[0], ', '.join(sorted(check_type_ids))))
+
+def get_conditions(model, url_glob=None, url_regex=None, status=None,
+                paused=None):
+    """
+    Returns the filters selecting checks of model whose url matches url_glob
+    and url_regex, that have the given status and, if paused isn't None, are
+    or aren't paused.
+    """
+    conditions = []
+    if url_glob is not None:
+        conditions.append(model.url.op('GLOB')(url_glob))
+    if url_regex is not None:
+        conditions.append(model.url.op('REGEXP')(url_regex))
+    if status == 'active' or paused is False:
+        conditions.append(model.run_after < paused_run_after)
+    if status == 'paused' or paused:
+        conditions.append(model.run_after >= paused_run_after)
+    if status == 'failing':
+        conditions.append(model.failed_since > 0)
+    elif status == 'ok':
+        conditions.append(or_(model.failed_since == None,
+                            model.failed_since == 0))
+    return conditions
+
+def validate_filters(check_types, url_regex, status):
+    """
+    Returns the models to act on or raises ValueError if a filter is invalid.
+    """
+    if status is not None and status not in check_statuses:
+        raise ValueError('Unknown status {}, choose from {}'.format(status,
+                                                    ', '.join(check_statuses)))
+    if url_regex is not None:
+        try:
+            re.compile(url_regex)
+        except re.error as e:
+            raise ValueError('invalid regular expression {}: {}'.format(
+                                                                url_regex, e))
+
+    return get_models(check_types)
+
+def describe(verb, counts):
+    """Input a verb and (check_type, count) pairs.  Returns a summary line"""
+    total = sum(count for check_type, count in counts)
+    return '{} {} checks{}'.format(verb, total, ''.join(
+                            '\n  {}: {}'.format(check_type, count)
+                            for check_type, count in counts if count))
+
+def count_checks(session, model, conditions):
+    return session.query(func.count(model.id)).filter(*conditions).scalar()
+
+def bulk_delete(session, check_types=None, url_glob=None, url_regex=None,
+                status=None, dry_run=False):
+    """
+    Delete every check of check_types whose url matches url_glob and url_regex
+    and that has status.  Returns message relating to success.
+
+    Each table is cleared with single statements that select the checks with
+    the same filters, their history and site pages go with them and their
+    blobs are released.  With dry_run the checks are only counted.
+    """
+    try:
+        models = validate_filters(check_types, url_regex, status)
+    except ValueError as e:
+        return 'Error: {}'.format(e)
+
+    counts = []
+    for model in models:
+        conditions = get_conditions(model, url_glob, url_regex, status)
+        if dry_run:
+            counts.append((model.check_type, count_checks(session, model,
+                                                            conditions)))
+            continue
+
+        check_ids = session.query(model.id).filter(*conditions).statement
+        if model is DiffCheck:
+            release_matching_content(session, DiffCheck.content_hash,
+                                conditions)
+        elif model is SiteCheck:
+            page_conditions = [SitePage.site_id.in_(check_ids)]
+            release_matching_content(session, SitePage.content_hash,
+                                page_conditions)
+            session.query(SitePage).filter(*page_conditions).delete(
+                                                synchronize_session=False)
+
+        session.query(CheckHistory).filter(
+                CheckHistory.check_type == check_type_ids[model.check_type],
+                CheckHistory.check_id.in_(check_ids)).delete(
+                                                synchronize_session=False)
+        counts.append((model.check_type, session.query(model).filter(
+                            *conditions).delete(synchronize_session=False)))
+
+    if dry_run:
+        return describe('Would remove', counts)
+
+    session.commit()
+    return describe('Removed', counts)
+
+def update_checks(session, values, check_types=None, url_glob=None,
+                url_regex=None, status=None, dry_run=False, paused=None):
+    """
+    Set values, a dict of column names to new values, on every matching check
+    with one UPDATE per table.  Checks are matched as for bulk_delete, paused
+    limits them to paused or unpaused checks.  Returns message relating to
+    success.
+    """
+    for field, value in values.items():
+        if field in ('check_frequency', 'check_timeout', 'max_down_time') \
+                and not isinstance(value, int):
+            return 'Error: {} {} given, must be an integer'.format(field,
+                                                                    value)
+    if values.get('check_timeout', 1) <= 0:
+        return 'Error: check-timeout {} given, must be greater than 0'.format(
+                                                    values['check_timeout'])
+    if values.get('priority', 1) <= 0:
+        return 'Error: priority {} given, must be greater than 0'.format(
+                                                        values['priority'])
+
+    try:
+        models = validate_filters(check_types, url_regex, status)
+    except ValueError as e:
+        return 'Error: {}'.format(e)
+
+    counts = []
+    for model in models:
+        conditions = get_conditions(model, url_glob, url_regex, status,
+                                paused)
+        if dry_run:
+            counts.append((model.check_type, count_checks(session, model,
+                                                            conditions)))
+        else:
+            counts.append((model.check_type, session.query(model).filter(
+                            *conditions).update(
+                                dict((getattr(model, field), value)
+                                        for field, value in values.items()),
+                                synchronize_session=False)))
+
+    if dry_run:
+        return describe('Would update', counts)
+
+    session.commit()
+    return describe('Updated', counts)
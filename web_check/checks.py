@@ -0,0 +1,339 @@
+import re
+import json
+import time
+from itertools import chain
+
+from web_check import events
+from web_check.archive import NotRecorded
+from web_check.defaults import default_max_backoff, \
+    default_hash_algorithm, default_check_batch_size
+from web_check.blobs import store_content
+from web_check.compare import compare_hash, compare_content, compare_string
+from web_check.fingerprint import fingerprint
+from web_check.history import record, encode_fingerprint, status_failed, \
+    status_refused
+from web_check.models import check_models, paused_run_after
+from web_check.normalize import load_normalizers
+from web_check.region import get_region
+from web_check.schedule import get_schedule, iter_scheduled_checks
+from web_check.sitemap import check_site
+from web_check.text import get_text
+from web_check.transport import request_url, HostUnavailable, RequestFailed
+
+def get_backoff(check, current_time, max_backoff=default_max_backoff):
+    """
+    Input a failing check.  Returns the number of seconds to wait before it is
+    retried.
+
+    The wait is as long as the check has been failing for, so it doubles with
+    each failed attempt, starting from check_frequency and capped at
+    max_backoff.  Retries are never pushed past the first normal run after
+    max_down_time so the warning is printed when it would have been without
+    backing off.
+    """
+    down_for = current_time - check.failed_since
+    if max_backoff <= 0 or check.check_frequency <= 0:
+        return check.check_frequency
+
+    delay = max(check.check_frequency, min(down_for, max_backoff))
+    warn_in = check.failed_since + check.max_down_time - current_time
+    if warn_in > 0:
+        runs_until_warning = -(-warn_in // check.check_frequency)
+        delay = min(delay, runs_until_warning * check.check_frequency)
+
+    return delay
+
+def failed_connection(check, session, max_backoff=default_max_backoff):
+    current_time = time.time()
+    if not check.failed_since:
+        check.failed_since = current_time
+    check.run_after = current_time + get_backoff(check, current_time,
+                                                max_backoff)
+    session.commit()
+    if current_time - check.failed_since >= check.max_down_time:
+        events.emit('down', check, failed_since=int(check.failed_since))
+
+    return ''
+
+def check_if_recovered(check, session):
+    if not check.failed_since:
+        return ''
+    check.failed_since = 0
+    session.commit()
+    last_run = check.run_after - check.check_frequency
+    if last_run - check.failed_since >= check.max_down_time:
+        events.emit('recovered', check)
+
+    return ''
+
+def fetch(check, session, hosts, max_backoff=default_max_backoff,
+        history=None, archive=None):
+    """
+    Input a check, the HostPoliteness for the run and optionally a
+    HistoryRecorder and a RecordArchive or ReplayArchive.  Returns the
+    response for check.url or None if the request failed, in which case
+    failed_connection has already been called and the failure recorded.
+
+    A url missing from a replayed archive is reported as an error without
+    counting as a failure, the host wasn't asked.
+    """
+    try:
+        url_content = request_url(check.url, check.check_timeout, hosts,
+                                archive)
+    except HostUnavailable:
+        record(history, check, status_refused)
+        failed_connection(check, session, max_backoff)
+        return None
+    except RequestFailed as e:
+        record(history, check, status_failed, e.elapsed)
+        failed_connection(check, session, max_backoff)
+        return None
+    except NotRecorded as e:
+        events.emit('error', check, message=str(e))
+        return None
+
+    if url_content.status_code != 200:
+        record(history, check, url_content.status_code,
+            url_content.elapsed.total_seconds(), len(url_content.content))
+        failed_connection(check, session, max_backoff)
+        return None
+
+    return url_content
+
+def iter_due_checks(session, model, batch_size, due_before=None):
+    """
+    Input a check model.  Yields the checks that are due in id order,
+    batch_size at a time.  Checks are due if their run_after is before
+    due_before, which defaults to now.
+
+    Each batch is removed from the session once it has been processed so
+    memory doesn't grow with the number of checks.  Checks must be committed
+    before the next batch is fetched.
+    """
+    last_id = 0
+    while True:
+        batch = session.query(model).filter(
+                    model.run_after < (due_before or time.time()),
+                    model.id > last_id).order_by(model.id).limit(
+                                                        batch_size).all()
+        if not batch:
+            return
+
+        last_id = batch[-1].id
+        for check in batch:
+            yield check
+
+        del batch
+        session.expunge_all()
+
+def get_due_urls(session, due_before=None):
+    """
+    Yields the url of every check that is due, due_before defaults to now.
+    """
+    for model in check_models:
+        for row in session.query(model.url).filter(
+                                model.run_after < (due_before or time.time())):
+            yield row.url
+
+def get_raw_fingerprint(url_content, algorithm):
+    """
+    Input a response and the hash_algorithm stored with a RawCheck.  Returns
+    the fingerprint of the response body.
+
+    RawChecks stored before the algorithm was recorded have none, they hashed
+    the decoded text with md5 rather than the bytes received.
+    """
+    if algorithm is None:
+        return fingerprint(url_content.text.encode('utf-8'), 'md5')
+
+    return fingerprint(url_content.content, algorithm)
+
+def evaluate_md5(check, session, url_content, row, normalizers,
+                hash_algorithm, hosts, archive):
+    message = 'Failed to hash response from {}'.format(check.url)
+    try:
+        text = get_text(url_content.text, normalizers.for_url(check.url))
+    except:
+        events.emit('error', check, message=message)
+        return
+
+    try:
+        changed, new_hash = compare_hash(session, check, check, text,
+                                    hash_algorithm)
+    except ValueError:
+        events.emit('error', check, message=message)
+        return
+
+    row['fingerprint'] = encode_fingerprint(new_hash)
+    if changed:
+        row['changed'] = 1
+
+def evaluate_string(check, session, url_content, row, normalizers,
+                hash_algorithm, hosts, archive):
+    text = get_text(url_content.text, normalizers.for_url(check.url))
+    if compare_string(session, check, check, text):
+        row['changed'] = 1
+
+def evaluate_diff(check, session, url_content, row, normalizers,
+                hash_algorithm, hosts, archive):
+    if check.content_hash is None and check.current_content is not None:
+        # Checks stored before blobs existed move their content to one
+        check.content_hash = store_content(session, check.current_content)
+        check.current_content = None
+        session.commit()
+
+    text = get_text(url_content.text, normalizers.for_url(check.url))
+    changed, key = compare_content(session, check, check, text)
+    row['fingerprint'] = encode_fingerprint(key)
+    if changed:
+        row['changed'] = 1
+
+def evaluate_raw(check, session, url_content, row, normalizers,
+                hash_algorithm, hosts, archive):
+    try:
+        new_hash = get_raw_fingerprint(url_content, check.hash_algorithm)
+    except:
+        events.emit('error', check, message='Failed to hash response \
+from {}'.format(check.url))
+        return
+
+    if check.hash_algorithm != hash_algorithm:
+        changed = new_hash != check.current_hash
+        new_hash = fingerprint(url_content.content, hash_algorithm)
+        check.hash_algorithm = hash_algorithm
+        if not changed:
+            check.current_hash = new_hash
+            session.commit()
+
+    row['fingerprint'] = encode_fingerprint(new_hash)
+    if new_hash == check.current_hash:
+        return
+
+    check.old_hash = check.current_hash
+    check.current_hash = new_hash
+    session.commit()
+    region = get_region(url_content.text, check.start_marker,
+                    check.end_marker, check.selector, check.source)
+    if region is None:
+        events.emit('error', check, message='could not find the region \
+to match on {}'.format(check.url))
+        return
+
+    try:
+        m = re.search(check.expression, region, re.S)
+    except:
+        # I couldn't catch the sre_constants.error I'm looking for so...
+        events.emit('error', check, message='invalid regular expression')
+        return
+
+    try:
+        capture_groups = m.groups()
+    except AttributeError:
+        events.emit('error', check, message='no matches for regular \
+expression on {}'.format(check.url))
+        return
+
+    try:
+        old_capture_groups = tuple(json.loads(check.capture_groups))
+    except:
+        events.emit('error', check, message='could not retreive data for \
+raw check of {}'.format(check.url))
+        return
+
+    if capture_groups == old_capture_groups:
+        return
+
+    row['changed'] = 1
+    events.emit('capture_group_changed', check,
+                expression=check.expression,
+                old=list(old_capture_groups),
+                new=list(capture_groups))
+
+    check.capture_groups = json.dumps(capture_groups)
+    session.commit()
+
+def evaluate_site(check, session, url_content, row, normalizers,
+                hash_algorithm, hosts, archive):
+    if check_site(session, check, url_content, hosts, archive, normalizers,
+                hash_algorithm):
+        row['changed'] = 1
+
+evaluators = {'md5': evaluate_md5,
+            'string': evaluate_string,
+            'diff': evaluate_diff,
+            'raw': evaluate_raw,
+            'site': evaluate_site}
+
+def run_check(check, session, hosts, normalizers,
+            max_backoff=default_max_backoff,
+            hash_algorithm=default_hash_algorithm, history=None, archive=None):
+    """
+    Fetch a check of any type and evaluate the response.  The check's next
+    run is scheduled before it is fetched.
+    """
+    check.run_after = time.time() + check.check_frequency
+    session.commit()
+    for message in normalizers.take_errors(check.url):
+        events.emit('error', check, message=message)
+    url_content = fetch(check, session, hosts, max_backoff, history, archive)
+    if url_content is None:
+        return
+
+    row = record(history, check, url_content.status_code,
+            url_content.elapsed.total_seconds(), len(url_content.content))
+    check_if_recovered(check, session)
+    evaluators[check.check_type](check, session, url_content, row,
+                            normalizers, hash_algorithm, hosts, archive)
+
+def run_checks(session, hosts, max_backoff=default_max_backoff,
+            hash_algorithm=default_hash_algorithm, history=None,
+            check_batch_size=default_check_batch_size, archive=None,
+            run_all=False, time_budget=None, report=None):
+    """
+    Perform hash, string, difference, raw and site checks for all stored url's
+
+    hosts is the HostPoliteness to fetch through, pass the same one to
+    consecutive calls to keep rate limits and circuit breakers between runs.
+
+    Hashes are compared using the algorithm stored with each check then
+    replaced with hash_algorithm ones, so changing algorithm doesn't cause
+    false alerts.
+
+    Results are sent to the current events sink, which is flushed once all
+    checks have run.  Every fetch is added to history if a HistoryRecorder is
+    given.  Due checks are loaded check_batch_size at a time.
+
+    archive records every response or replays recorded ones instead of using
+    the network, run_all runs every check that isn't paused whether or not it
+    is due.
+
+    Without a time_budget checks run a table at a time in id order.  With one
+    the most overdue checks of any type run first and no check is started
+    once time_budget seconds have passed, the rest stay due for the next run.
+    How late each check was is added to report if a LatenessReport is given.
+    """
+    due_before = paused_run_after if run_all else None
+    normalizers = load_normalizers(session)
+    if time_budget is None:
+        due_checks = chain.from_iterable(iter_due_checks(session, model,
+                        check_batch_size, due_before) for model in check_models)
+    else:
+        deadline = time.time() + time_budget
+        schedule = get_schedule(session, due_before)
+        due_checks = iter_scheduled_checks(session, schedule, check_batch_size)
+
+    for count, check in enumerate(due_checks):
+        if time_budget is not None and time.time() >= deadline:
+            if report is not None:
+                report.left_due = len(schedule) - count
+            break
+
+        if report is not None:
+            report.add(check)
+        run_check(check, session, hosts, normalizers, max_backoff,
+                hash_algorithm, history, archive)
+
+    if history is not None:
+        history.flush()
+    events.flush()
+    return ''
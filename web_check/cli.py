@@ -0,0 +1,450 @@
+import sys
+import time
+import argparse
+
+from web_check.defaults import default_max_down_time, \
+    default_check_frequency, default_check_timeout, \
+    default_database_location, default_host_rate, default_host_burst, \
+    default_breaker_threshold, default_breaker_cooldown, \
+    default_max_backoff, default_hash_algorithm, default_output, \
+    default_output_format, default_batch_size, default_history_days, \
+    default_keep_history, default_downsample_after, default_check_batch_size, \
+    default_dns_ttl
+from web_check.events import output_formats
+from web_check.fingerprint import hash_algorithms, get_hasher
+
+# Settings that can be changed on many checks at once with --set-<field>
+bulk_fields = ('check_frequency', 'check_timeout', 'max_down_time', 'priority')
+
+import_error_message = """Import failed make sure you have set up the virtual enviroment.
+python3 -m venv venv
+source venv/bin/activate
+pip install -r requirements.txt"""
+
+def get_parser():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-c', '--check', action='store_true',
+        help='Run checks against all monitored urls')
+    parser.add_argument('-l', '--list', action='store_true',
+        help='Maximum number of set string that can occur')
+    parser.add_argument('-d', '--delete', nargs=2,
+        help='The entry to delete id must be used')
+    parser.add_argument('-a', '--add', nargs='+',
+        help='The type of check to setup and what url to check against')
+    parser.add_argument('-r', '--add-rule', nargs='+',
+        help='Add a normalization rule: regex|exclude pattern host-or-url [replacement]')
+    parser.add_argument('--delete-rule', type=int,
+        help='The id of the normalization rule to delete')
+    parser.add_argument('--history',
+        help='Show the recorded fetches and changes for a url')
+    parser.add_argument('--days', type=int,
+        default=default_history_days,
+        help='Number of days of history to show')
+    parser.add_argument('--prune-history', action='store_true',
+        help='Delete and downsample old history')
+    parser.add_argument('--keep-history', type=int,
+        default=default_keep_history,
+        help='Number of days of history --prune-history keeps')
+    parser.add_argument('--downsample-after', type=int,
+        default=default_downsample_after,
+        help='Days after which --prune-history keeps one row per check per day, plus changes')
+    parser.add_argument('--no-history', action='store_true',
+        help='Don\'t record fetches while running checks')
+    parser.add_argument('--start-marker',
+        help='Raw checks only match after the first occurrence of this text')
+    parser.add_argument('--end-marker',
+        help='Raw checks only match before the next occurrence of this text')
+    parser.add_argument('--selector',
+        help='Raw checks only match inside the first element matching this tag, .class or #id')
+    parser.add_argument('--match-text', action='store_true',
+        help='Raw checks match against the page with the html stripped')
+    parser.add_argument('--similarity-threshold', type=float,
+        help='md5, diff and site checks ignore changes leaving the text at least this similar, from 0 for unrelated text to 1 for identical')
+    parser.add_argument('--max-down-time', type=int,
+        default=default_max_down_time,
+        help='Number of seconds a site can be down for before warning')
+    parser.add_argument('--check-frequency', type=int,
+        default=default_check_frequency,
+        help='Specify the number of seconds to check after')
+    parser.add_argument('--check-timeout', type=int,
+        default=default_check_timeout,
+        help='Specify the number of seconds to check_timeout after')
+    parser.add_argument('--database-location',
+        default=default_database_location,
+        help='Specify a database name and location')
+    parser.add_argument('--import-file',
+        help='Chose a file to populate the database from')
+    parser.add_argument('--host-rate', type=float,
+        default=default_host_rate,
+        help='Maximum requests a second to any one host, 0 for no limit')
+    parser.add_argument('--host-burst', type=int,
+        default=default_host_burst,
+        help='Number of requests a host can be sent at once before --host-rate applies')
+    parser.add_argument('--breaker-threshold', type=int,
+        default=default_breaker_threshold,
+        help='Consecutive failures before the rest of a host\'s checks fail fast, 0 to disable')
+    parser.add_argument('--breaker-cooldown', type=int,
+        default=default_breaker_cooldown,
+        help='Seconds before a tripped host is probed again')
+    parser.add_argument('--max-backoff', type=int,
+        default=default_max_backoff,
+        help='Longest number of seconds to wait between retries of a failing check, 0 to disable backing off')
+    parser.add_argument('--hash-algorithm', choices=hash_algorithms,
+        default=default_hash_algorithm,
+        help='Algorithm used to fingerprint content, existing checks move over the next time they run')
+    parser.add_argument('--check-batch-size', type=int,
+        default=default_check_batch_size,
+        help='Number of due checks to load from the database at a time')
+    parser.add_argument('--record', metavar='DIR',
+        help='Save every response fetched while running checks to DIR')
+    parser.add_argument('--replay', metavar='DIR',
+        help='Run checks against the responses saved in DIR instead of the network, on a copy of the database that is thrown away')
+    parser.add_argument('--run-all', action='store_true',
+        help='Run every check whether or not it is due')
+    parser.add_argument('--time-budget', type=float, metavar='SECONDS',
+        help='Run the most overdue checks first and start no more after SECONDS')
+    parser.add_argument('--priority', type=float,
+        help='How much more urgent a check being added is when runs have a time budget')
+    parser.add_argument('--bulk-delete', action='store_true',
+        help='Delete every check chosen with the --match options')
+    parser.add_argument('--pause', action='store_true',
+        help='Stop running the checks chosen with the --match options')
+    parser.add_argument('--resume', action='store_true',
+        help='Run paused checks chosen with the --match options again')
+    parser.add_argument('--set-check-frequency', type=int,
+        help='Change check_frequency of the checks chosen with the --match options')
+    parser.add_argument('--set-check-timeout', type=int,
+        help='Change check_timeout of the checks chosen with the --match options')
+    parser.add_argument('--set-max-down-time', type=int,
+        help='Change max_down_time of the checks chosen with the --match options')
+    parser.add_argument('--set-priority', type=float,
+        help='Change priority of the checks chosen with the --match options')
+    parser.add_argument('--match-url', metavar='GLOB',
+        help='Choose checks whose url matches a glob such as *://example.com/*')
+    parser.add_argument('--match-regex', metavar='REGEX',
+        help='Choose checks whose url matches a regular expression')
+    parser.add_argument('--match-type', action='append',
+        help='Choose checks of a type, can be given more than once')
+    parser.add_argument('--match-status',
+        help='Choose active, paused, failing or ok checks')
+    parser.add_argument('--dry-run', action='store_true',
+        help='Count the checks a bulk change would affect without changing them')
+    parser.add_argument('--dns-ttl', type=int, default=default_dns_ttl,
+        help='Seconds to cache lookups whose ttl isn\'t known, 0 to only use record ttls')
+    parser.add_argument('--dns-record-ttls', action='store_true',
+        help='Look hosts up in DNS with dnspython and cache them for their record ttls')
+    parser.add_argument('--prewarm', action='store_true',
+        help='Resolve every host with due checks in parallel before running them')
+    parser.add_argument('--output', default=default_output,
+        help='Where to send check results: - for stdout, unix:/path for a local socket or a file to append to')
+    parser.add_argument('--output-format', choices=output_formats,
+        default=default_output_format,
+        help='Write results as text messages or one JSON event per line')
+    parser.add_argument('--batch-size', type=int,
+        default=default_batch_size,
+        help='Number of results to collect before writing them out')
+    parser.allow_abbrev = False
+    return parser
+
+def get_bulk_values(args):
+    """Returns the columns to change given with the --set options"""
+    values = {}
+    for field in bulk_fields:
+        value = getattr(args, 'set_{}'.format(field))
+        if value is not None:
+            values[field] = value
+    return values
+
+def main(argv=None):
+    """
+    Command line entry point.
+
+    requests, html2text and SQLAlchemy are only imported once the arguments
+    show they are needed, printing the help doesn't touch any of them.
+    """
+    args = get_parser().parse_args(argv)
+    if not (args.check or args.list or args.add or args.delete
+            or args.import_file or args.add_rule
+            or args.delete_rule is not None or args.history
+            or args.prune_history or args.bulk_delete or args.pause
+            or args.resume or get_bulk_values(args)):
+        print_help()
+        return
+
+    try:
+        if args.check and args.replay:
+            from web_check.archive import scratch_database
+            with scratch_database(args.database_location) as location:
+                run(args, location)
+        else:
+            run(args, args.database_location)
+    except ImportError:
+        print(import_error_message)
+        exit(1)
+
+def run(args, database_location):
+    """
+    Carry out the command in args against the database at database_location,
+    replayed runs are given a copy so they don't change the real checks.
+    """
+    import sqlalchemy
+    from web_check.models import connect, paused_run_after
+    from web_check import events
+    from web_check.checks import run_checks, get_due_urls
+    from web_check.resolver import DNSCache, prewarm, get_resolver
+    from web_check.schedule import LatenessReport
+    from web_check.bulk import bulk_delete, update_checks
+    from web_check.archive import RecordArchive, ReplayArchive
+    from web_check.history import HistoryRecorder, show_history, \
+        prune_history
+    from web_check.politeness import HostPoliteness
+    from web_check.manage import add_md5, add_string, add_diff, add_raw, \
+        add_site, list_checks, delete_check, import_from_file, add_rule, \
+        delete_rule
+
+    try:
+        get_hasher(args.hash_algorithm)
+    except ValueError as e:
+        print('Error: {}'.format(e))
+        exit(1)
+
+    try:
+        session = connect(database_location)
+    except sqlalchemy.exc.OperationalError:
+        print('Could not create or connect to database at {}'.format(
+                                                    args.database_location))
+        exit(1)
+
+    bulk_values = get_bulk_values(args)
+    hosts = HostPoliteness(args.host_rate, args.host_burst,
+                        args.breaker_threshold, args.breaker_cooldown)
+    if args.check:
+        try:
+            sink = events.EventSink(events.open_destination(args.output),
+                                args.output_format, args.batch_size)
+        except (OSError, IOError) as e:
+            print('Error: could not open output {}: {}'.format(args.output, e))
+            exit(1)
+
+        if args.record and args.replay:
+            print('Error: choose either --record or --replay')
+            exit(1)
+
+        archive = None
+        try:
+            if args.record:
+                archive = RecordArchive(args.record)
+            elif args.replay:
+                archive = ReplayArchive(args.replay)
+        except (OSError, IOError) as e:
+            print('Error: {}'.format(e))
+            exit(1)
+
+        try:
+            resolver = get_resolver(args.dns_record_ttls)
+        except ValueError as e:
+            print('Error: {}'.format(e))
+            exit(1)
+
+        events.set_sink(sink)
+        history = None
+        if not (args.no_history or args.replay):
+            history = HistoryRecorder(session)
+        start = time.time()
+        dns_cache = DNSCache(resolver, args.dns_ttl)
+        report = LatenessReport()
+        try:
+            with dns_cache.installed():
+                if args.prewarm and not args.replay:
+                    due_before = paused_run_after if args.run_all else None
+                    failed = prewarm(dns_cache, get_due_urls(session,
+                                                            due_before))
+                    if failed:
+                        sys.stderr.write('{} hosts could not be resolved \
+while pre-warming\n'.format(failed))
+                run_checks(session, hosts, args.max_backoff,
+                        args.hash_algorithm, history,
+                        max(args.check_batch_size, 1), archive, args.run_all,
+                        args.time_budget, report)
+        finally:
+            sink.close()
+        # Kept out of the results so it can be collected to size the fleet
+        sys.stderr.write(report.summary(time.time() - start) + '\n')
+        if args.replay:
+            # Replaying only measures evaluation, report it apart from results
+            sys.stderr.write('Evaluated checks in {:.3f}s\n'.format(
+                                                        time.time() - start))
+    elif args.list:
+        list_checks(session)
+    elif args.add:
+        if args.add[0] == 'md5':
+            if len(args.add) != 2:
+                print('call as -a \'md5\' \'url-to-check\'')
+                exit(1)
+
+            print(add_md5(session, args.add[1], args.max_down_time,
+                        args.check_frequency, args.check_timeout,
+                        args.hash_algorithm, args.similarity_threshold,
+                        args.priority))
+        elif args.add[0] == 'string':
+            if len(args.add) != 3:
+                print('call as -a \'string\' string-to-check \'url-to-check\'')
+                exit(1)
+
+            print(add_string(session, args.add[2], args.add[1],
+                    args.max_down_time, args.check_frequency,
+                    args.check_timeout, args.priority))
+        elif args.add[0] == 'diff':
+            if len(args.add) != 2:
+                print('call as -a \'diff\' \'url-to-check\'')
+                exit(1)
+
+            print(add_diff(session, args.add[1], args.max_down_time,
+                    args.check_frequency, args.check_timeout,
+                    args.similarity_threshold, args.priority))
+        elif args.add[0] == 'raw':
+            if len(args.add) != 3:
+                print('call as -a \'raw\' \'expression\' \'url-to-check\'')
+                exit(1)
+
+            print(add_raw(session, args.add[2], args.add[1],
+                    args.max_down_time, args.check_frequency,
+                    args.check_timeout, args.hash_algorithm,
+                    args.start_marker, args.end_marker, args.selector,
+                    'text' if args.match_text else 'html', args.priority))
+        elif args.add[0] == 'site':
+            if len(args.add) not in (3, 4) or (len(args.add) == 4) != (
+                                                    args.add[1] == 'string'):
+                print('call as -a \'site\' \'md5-or-diff\' \'sitemap-url\'')
+                print('     or -a \'site\' \'string\' string-to-check \'sitemap-url\'')
+                exit(1)
+
+            print(add_site(session, args.add[-1], args.add[1],
+                    args.max_down_time, args.check_frequency,
+                    args.check_timeout,
+                    args.add[2] if len(args.add) == 4 else None,
+                    args.priority, args.similarity_threshold))
+        else:
+            print('Choose either md5, string, diff, raw or site.')
+
+    elif args.delete:
+        if len(args.delete) != 2:
+            print('call as -d \'check_type\' \'url-to-remove\'')
+            exit(1)
+
+        print(delete_check(session, args.delete[0], args.delete[1]))
+    elif args.add_rule:
+        if len(args.add_rule) not in (3, 4):
+            print('call as -r \'regex\' \'expression\' \'host-or-url\' \'replacement\'')
+            print('     or -r \'exclude\' \'selector\' \'host-or-url\'')
+            exit(1)
+
+        print(add_rule(session, *args.add_rule))
+    elif args.delete_rule is not None:
+        print(delete_rule(session, args.delete_rule))
+    elif args.history:
+        print(show_history(session, args.history, args.days))
+    elif args.prune_history:
+        print('Removed {} history rows'.format(prune_history(session,
+                                    args.keep_history, args.downsample_after)))
+    elif args.import_file:
+        error = import_from_file(session, args.import_file,
+                                args.hash_algorithm)
+        if error:
+            print(error)
+            exit(1)
+
+    elif args.bulk_delete or args.pause or args.resume or bulk_values:
+        if not (args.match_url or args.match_regex or args.match_type
+                or args.match_status):
+            print('Error: choose checks with --match-url, --match-regex, \
+--match-type or --match-status, --match-url \'*\' chooses every check')
+            exit(1)
+
+        filters = (args.match_type, args.match_url, args.match_regex,
+                args.match_status, args.dry_run)
+        if args.bulk_delete:
+            print(bulk_delete(session, *filters))
+        elif args.pause:
+            print(update_checks(session, {'run_after': paused_run_after},
+                            *filters, paused=False))
+        elif args.resume:
+            # Resumed checks run on the next -c
+            print(update_checks(session, {'run_after': int(time.time())},
+                            *filters, paused=True))
+        else:
+            print(update_checks(session, bulk_values, *filters))
+
+def print_help():
+    print("""\
+Arguments:
+  -h/--help\t\tShow the help message and exit
+  -c/--check\t\tRun checks against all monitored urls, how late they
+  \t\t\t\tstarted is summarised on stderr
+  -l/--list\t\tList stored checks from the database
+  -a/--add\t\tAdds a check to the database:
+  \t\t\t\t-a md5 [url]
+  \t\t\t\t-a string [string] [url]
+  \t\t\t\t-a diff [url]
+  \t\t\t\t-a raw [expression] [url]
+  \t\t\t\traw checks can be narrowed with --start-marker,
+  \t\t\t\t--end-marker, --selector and --match-text
+  \t\t\t\tmd5, diff and site checks can ignore small changes with
+  \t\t\t\t--similarity-threshold, from 0 for unrelated text to 1
+  \t\t\t\tfor identical, a few edited lines score about 0.8
+  \t\t\t\t-a site [md5 or diff] [sitemap url]
+  \t\t\t\t-a site string [string] [sitemap url]
+  \t\t\t\tsite checks only fetch pages whose sitemap lastmod
+  \t\t\t\thas changed
+  -d/--delete\t\tDelete a check:
+  \t\t\t\t-d [check_type] [url]
+  -r/--add-rule\t\tIgnore changing parts of md5, string and diff checks:
+  \t\t\t\t-r regex [expression] [host or url] [replacement]
+  \t\t\t\t-r exclude [selector] [host or url]
+  --delete-rule\t\tDelete a normalization rule by id
+  --history\t\tShow recorded fetches and changes for a url:
+  \t\t\t\t--history [url] --days [days]
+  --prune-history\tDelete history older than --keep-history days and keep
+  \t\t\t\tone row per check per day after --downsample-after days
+  --no-history\t\tDon't record fetches while running checks
+  --max-down-time\t\tNumber of seconds a site can be down for before warning
+  --check-frequency\tNumber of seconds to wait between checks
+  --check-timeout\t\tNumber of seconds to check_timeout after
+  --database-location\tSpecify a database name and location
+  --import-file\t\tSpecify a file to populate the database from
+  --host-rate\t\tMaximum requests a second to any one host
+  --host-burst\t\tRequests a host can be sent at once before --host-rate applies
+  --breaker-threshold\tConsecutive failures before a host's checks fail fast
+  --breaker-cooldown\tSeconds before a failing host is probed again
+  --max-backoff\t\tLongest number of seconds between retries of a failing check
+  --hash-algorithm\tAlgorithm used to fingerprint content:
+  \t\t\t\tmd5, blake2b, xxh3_64 or xxh3_128 (needs xxhash)
+  --check-batch-size\tNumber of due checks to load at a time
+  --record\t\tSave every response fetched by -c to a directory
+  --replay\t\tRun -c against responses saved by --record, no network,
+  \t\t\t\ton a throwaway copy of the database without history
+  --run-all\t\tRun every check whether or not it is due
+  --time-budget\t\tRun the most overdue checks of any type first and start
+  \t\t\t\tno more after this many seconds
+  --priority\t\tMultiplies how overdue a check being added counts as
+  --bulk-delete\t\tDelete every check chosen with the --match options
+  --pause\t\tStop running the checks chosen with the --match options
+  --resume\t\tRun paused checks chosen with the --match options again
+  --set-check-frequency, --set-check-timeout, --set-max-down-time,
+  --set-priority\t\tChange a setting of the checks chosen with the --match
+  \t\t\t\toptions, each table is changed with a single statement
+  --match-url\t\tChoose checks whose url matches a glob
+  --match-regex\t\tChoose checks whose url matches a regular expression
+  --match-type\t\tChoose checks of a type, can be repeated
+  --match-status\tChoose active, paused, failing or ok checks
+  --dry-run\t\tCount the checks a bulk change would affect
+  --dns-ttl\t\tSeconds to cache host lookups when their ttl isn't known
+  --dns-record-ttls\tLook hosts up in DNS with dnspython, bypassing
+  \t\t\t\t/etc/hosts, and cache them for their record ttls
+  --prewarm\t\tResolve every host with due checks in parallel first,
+  \t\t\t\thosts are only looked up, not connected to
+  --output\t\tWhere to send check results:
+  \t\t\t\t- for stdout, unix:/path for a socket or a file
+  --output-format\tWrite results as text or jsonl
+  --batch-size\t\tNumber of results to collect before writing them out\
+  """)
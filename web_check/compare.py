@@ -0,0 +1,130 @@
+import difflib
+
+from web_check import events
+from web_check.blobs import content_key, store_content, release_content, \
+    get_content
+from web_check.fingerprint import fingerprint
+from web_check.similarity import simhash, similarity
+
+def is_minor_change(check, state, text):
+    """
+    Input an md5, diff or site check, the check or site page whose content has
+    changed and its new text.  Returns True if the check has a
+    similarity_threshold and text is at least that similar to the content
+    state last alerted on.
+
+    Minor changes are neither alerted on nor stored, so the stored content
+    stays what was last alerted on and small changes add up until they cross
+    the threshold.  States without a simhash take one from text.
+    """
+    if check.similarity_threshold is None:
+        return False
+
+    new_simhash = simhash(text)
+    if state.simhash is not None and similarity(state.simhash,
+                                new_simhash) >= check.similarity_threshold:
+        return True
+
+    state.simhash = new_simhash
+    return False
+
+def record_first(check, state, text):
+    """Take the simhash of a site page's first content if it is needed"""
+    if check.similarity_threshold is not None:
+        state.simhash = simhash(text)
+
+def compare_hash(session, check, state, text, hash_algorithm, **details):
+    """
+    Input the check being evaluated, the MD5Check or SitePage holding the
+    hash its content is compared with and the new text.  Returns (changed,
+    fingerprint of text).
+
+    changed or reverted is emitted with details, the hash is compared using
+    the algorithm stored with state then replaced with a hash_algorithm one.
+    State without a hash only has the text's hash recorded.  Raises ValueError
+    if an algorithm is unavailable.
+    """
+    data = text.encode('utf-8')
+    if state.current_hash is None:
+        state.current_hash = fingerprint(data, hash_algorithm)
+        state.hash_algorithm = hash_algorithm
+        record_first(check, state, text)
+        session.commit()
+        return (False, state.current_hash)
+
+    algorithm = state.hash_algorithm or 'md5'
+    new_hash = fingerprint(data, algorithm)
+    changed = new_hash != state.current_hash
+    minor = changed and is_minor_change(check, state, text)
+    if changed and not minor:
+        if new_hash == state.old_hash:
+            events.emit('reverted', check, **details)
+        else:
+            events.emit('changed', check, **details)
+
+        state.old_hash = state.current_hash
+        state.current_hash = new_hash
+        session.commit()
+
+    if algorithm != hash_algorithm and not minor:
+        # old_hash can't be rehashed without the content it came from and
+        # after a minor change neither can current_hash, it moves over once
+        # the content matches it again or changes enough to be stored
+        new_hash = state.current_hash = fingerprint(data, hash_algorithm)
+        state.old_hash = None
+        state.hash_algorithm = hash_algorithm
+        session.commit()
+
+    return (changed and not minor, new_hash)
+
+def compare_content(session, check, state, text, **details):
+    """
+    Input the check being evaluated, the DiffCheck or SitePage holding the
+    content it is compared with and the new text.  Returns (changed, blob key
+    of text).
+
+    changed is emitted with details and a diff, the new content is stored and
+    the old blob released.  State without content only has text stored.
+    """
+    key = content_key(text)
+    if state.content_hash is None:
+        state.content_hash = store_content(session, text, key)
+        record_first(check, state, text)
+        session.commit()
+        return (False, key)
+
+    # Checked before the diff so minor changes never pay for one
+    if key == state.content_hash or is_minor_change(check, state, text):
+        return (False, key)
+
+    events.emit('changed', check, diff=list(difflib.context_diff(
+                    get_content(session, state.content_hash).split('\n'),
+                    text.split('\n'),
+                    fromfile='Old content for {}'.format(state.url),
+                    tofile='New content for {}'.format(state.url),
+                    lineterm='')), **details)
+
+    old_key = state.content_hash
+    state.content_hash = store_content(session, text, key)
+    release_content(session, (old_key,))
+    session.commit()
+    return (True, key)
+
+def compare_string(session, check, state, text, **details):
+    """
+    Input the check being evaluated, the StringCheck or SitePage recording
+    whether its string was present and the new text.  Returns True if the
+    string appeared or disappeared, which is emitted with details.  State
+    without a record only has it recorded.
+    """
+    found = int(check.string_to_match in text)
+    changed = state.present is not None and found != state.present
+    if changed:
+        events.emit('string_appeared' if found else 'string_disappeared',
+                    check, string=check.string_to_match, **details)
+
+    if found != state.present:
+        state.present = found
+        session.commit()
+
+    return changed
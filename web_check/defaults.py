@@ -0,0 +1,18 @@
+default_max_down_time = 86400
+default_check_frequency = 3600
+default_check_timeout = 30
+default_database_location = 'web_checks.db'
+default_host_rate = 0
+default_host_burst = 1
+default_breaker_threshold = 3
+default_breaker_cooldown = 300
+default_max_backoff = 21600
+default_hash_algorithm = 'blake2b'
+default_output = '-'
+default_output_format = 'text'
+default_batch_size = 100
+default_history_days = 30
+default_keep_history = 90
+default_downsample_after = 7
+default_check_batch_size = 200
+default_dns_ttl = 300
@@ -0,0 +1,122 @@
+import sys
+import json
+import time
+import socket
+
+event_types = ('changed', 'reverted', 'string_appeared', 'string_disappeared',
+            'capture_group_changed', 'down', 'recovered', 'page_added',
+            'page_removed', 'error')
+output_formats = ('text', 'jsonl')
+
+def format_text(event):
+    """
+    Input an event.  Returns the message older versions printed for it.
+    Events for a page of a SiteCheck are reported against the page.
+    """
+    url = event.get('page', event['url'])
+    if event['event'] == 'changed' and 'diff' in event:
+        return '\n'.join(event['diff'])
+    if event['event'] == 'changed':
+        return 'The md5 for {} has changed'.format(url)
+    if event['event'] == 'reverted':
+        return 'The md5 for {} has been reverted'.format(url)
+    if event['event'] == 'string_appeared':
+        return '{} is now present on {}'.format(event['string'], url)
+    if event['event'] == 'string_disappeared':
+        return '{} is no longer present on {}'.format(event['string'], url)
+    if event['event'] == 'capture_group_changed':
+        lines = ['RawCheck with expression {} changed for {}'.format(
+                                                    event['expression'], url)]
+        for old, new in zip(event['old'], event['new']):
+            if old != new:
+                lines.append('{} has been changed to {}'.format(old, new))
+        return '\n'.join(lines)
+    if event['event'] == 'down':
+        return 'Warning: Can\'t connect to {}'.format(url)
+    if event['event'] == 'recovered':
+        return 'Reastablished connection to {}'.format(url)
+    if event['event'] == 'page_added':
+        return '{} has been added to {}'.format(url, event['url'])
+    if event['event'] == 'page_removed':
+        return '{} has been removed from {}'.format(url, event['url'])
+
+    return 'Error: {}'.format(event['message'])
+
+def format_jsonl(event):
+    return json.dumps(event, sort_keys=True)
+
+formatters = {'text': format_text, 'jsonl': format_jsonl}
+
+def open_destination(destination):
+    """
+    Input - for stdout, unix:/path/to/socket for a local socket or a file
+    path to append to.  Returns a file like object to write events to.
+    """
+    if destination == '-':
+        return sys.stdout
+
+    if destination.startswith('unix:'):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(destination[len('unix:'):])
+        return sock.makefile('w', encoding='utf-8')
+
+    return open(destination, 'a', encoding='utf-8')
+
+class EventSink(object):
+    """
+    Collects events and writes them out batch_size at a time.
+
+    Each write is a single call with the whole batch joined together, so a
+    large run pays for a handful of writes rather than one per line.
+    """
+    def __init__(self, stream, output_format='text', batch_size=100):
+        self.stream = stream
+        self.formatter = formatters[output_format]
+        self.batch_size = max(batch_size, 1)
+        self.buffer = []
+
+    def emit(self, event):
+        self.buffer.append(self.formatter(event))
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+
+        self.stream.write('\n'.join(self.buffer) + '\n')
+        self.stream.flush()
+        self.buffer = []
+
+    def close(self):
+        self.flush()
+        if self.stream is not sys.stdout:
+            self.stream.close()
+
+sink = EventSink(sys.stdout)
+
+def set_sink(new_sink):
+    """
+    Replace the sink events are sent to, the old one is flushed first.
+    Returns the old sink.
+    """
+    global sink
+    old_sink = sink
+    old_sink.flush()
+    sink = new_sink
+    return old_sink
+
+def flush():
+    sink.flush()
+
+def emit(event_type, check, **data):
+    """
+    Input the type of event, the check it happened to and any details.
+    Sends the event to the current sink.
+    """
+    event = {'time': int(time.time()),
+            'event': event_type,
+            'check': check.check_type,
+            'url': check.url}
+    event.update(data)
+    sink.emit(event)
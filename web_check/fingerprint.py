@@ -0,0 +1,38 @@
+import hashlib
+
+hash_algorithms = ('md5', 'blake2b', 'xxh3_64', 'xxh3_128')
+
+def get_hasher(algorithm):
+    """
+    Input the name of a fingerprint algorithm.  Returns a new hash object.
+
+    blake2b is truncated to 128 bits so its digests are the same length as
+    md5's.  The xxh3 algorithms are much faster non cryptographic hashes and
+    need the optional xxhash package.  Raises ValueError if the algorithm is
+    unknown or unavailable.
+    """
+    if algorithm == 'md5':
+        return hashlib.md5()
+    if algorithm == 'blake2b':
+        return hashlib.blake2b(digest_size=16)
+    if algorithm in ('xxh3_64', 'xxh3_128'):
+        try:
+            import xxhash
+        except ImportError:
+            raise ValueError('The {} hash algorithm needs xxhash installed, \
+pip install xxhash'.format(algorithm))
+
+        return getattr(xxhash, algorithm)()
+
+    raise ValueError('Unknown hash algorithm {}, choose from {}'.format(
+                                        algorithm, ', '.join(hash_algorithms)))
+
+def fingerprint(data, algorithm):
+    """
+    Input bytes (or anything supporting the buffer protocol) and the name of
+    an algorithm.  Returns the hex digest, data is hashed in place without
+    being copied.
+    """
+    h = get_hasher(algorithm)
+    h.update(data)
+    return h.hexdigest()
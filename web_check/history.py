@@ -0,0 +1,139 @@
+import time
+
+from sqlalchemy import func
+
+from web_check.models import check_models, CheckHistory
+
+check_type_ids = {'md5': 1, 'string': 2, 'diff': 3, 'raw': 4, 'site': 5}
+check_type_names = dict((v, k) for k, v in check_type_ids.items())
+
+# Stored in place of an http status code
+status_failed = 0
+status_refused = -1
+
+def encode_fingerprint(hex_digest):
+    """
+    Input a hex digest.  Returns its first 64 bits as a signed integer so it
+    fits a sqlite INTEGER.
+    """
+    if not hex_digest:
+        return None
+
+    value = int(hex_digest[:16], 16)
+    if value >= 2 ** 63:
+        value -= 2 ** 64
+    return value
+
+class HistoryRecorder(object):
+    """
+    Collects history rows and inserts them batch_size at a time with a single
+    executemany, rows can still be updated until they are flushed.
+    """
+    def __init__(self, session, batch_size=500):
+        self.session = session
+        self.batch_size = max(batch_size, 1)
+        self.rows = []
+
+    def append(self, row):
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+        self.rows.append(row)
+
+    def flush(self):
+        if not self.rows:
+            return
+
+        self.session.bulk_insert_mappings(CheckHistory, self.rows)
+        self.session.commit()
+        self.rows = []
+
+def record(history, check, status, latency=0, size=0):
+    """
+    Input a HistoryRecorder or None, a check and the result of fetching it.
+    Returns the row, set row['changed'] and row['fingerprint'] once the
+    content has been evaluated.
+    """
+    row = {'check_type': check_type_ids[check.check_type],
+        'check_id': check.id,
+        'time': int(time.time()),
+        'status': status,
+        'latency': int(latency * 1000),
+        'size': size,
+        'fingerprint': None,
+        'changed': 0}
+    if history is not None:
+        history.append(row)
+    return row
+
+def prune_history(session, keep_days, downsample_days):
+    """
+    Delete history older than keep_days.  Rows older than downsample_days are
+    thinned to one row per check per day, rows recording a change are always
+    kept.  Returns the number of rows deleted.
+    """
+    now = int(time.time())
+    deleted = session.query(CheckHistory).filter(
+                    CheckHistory.time < now - keep_days * 86400).delete(
+                                                synchronize_session=False)
+    if downsample_days < keep_days:
+        cutoff = now - downsample_days * 86400
+        keep = session.query(func.min(CheckHistory.id)).filter(
+                    CheckHistory.time < cutoff).group_by(
+                                        CheckHistory.check_type,
+                                        CheckHistory.check_id,
+                                        CheckHistory.time / 86400)
+        deleted += session.query(CheckHistory).filter(
+                    CheckHistory.time < cutoff,
+                    CheckHistory.changed == 0,
+                    ~CheckHistory.id.in_(keep.statement)).delete(
+                                                synchronize_session=False)
+
+    session.commit()
+    return deleted
+
+def find_checks(session, url):
+    """Returns (check_type_id, check) for every check of url"""
+    found = []
+    for model in check_models:
+        for check in session.query(model).filter(model.url == url):
+            found.append((check_type_ids[model.check_type], check))
+    return found
+
+def show_history(session, url, days):
+    """
+    Print a table of the history of every check of url over the last days
+    followed by a summary.  Returns message relating to success.
+    """
+    checks = find_checks(session, url)
+    if not checks:
+        return 'There are no checks for {}'.format(url)
+
+    since = int(time.time()) - days * 86400
+    table_skel = '| {: <6} | {: <19} | {: <6} | {: <10} | {: <10} | \
+{: <20} | {: <7} |'
+    print(table_skel.format('check', 'time', 'status', 'latency_ms', 'bytes',
+                            'fingerprint', 'changed'))
+    for check_type, check in checks:
+        fetches = changes = failures = total_latency = 0
+        for row in session.query(CheckHistory).filter(
+                        CheckHistory.check_type == check_type,
+                        CheckHistory.check_id == check.id,
+                        CheckHistory.time >= since).order_by(CheckHistory.time):
+            print(table_skel.format(check_type_names[row.check_type],
+                time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(row.time)),
+                str(row.status),
+                str(row.latency),
+                str(row.size),
+                str(row.fingerprint),
+                str(row.changed)))
+            fetches += 1
+            changes += row.changed
+            if row.status != 200:
+                failures += 1
+            total_latency += row.latency
+
+        print('{} check: {} fetches, {} changes, {} failures, average latency \
+{}ms in the last {} days'.format(check.check_type, fetches, changes, failures,
+                    total_latency // fetches if fetches else 0, days))
+
+    return ''
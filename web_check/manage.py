@@ -0,0 +1,1017 @@
+import re
+import json
+
+import sqlalchemy
+
+from web_check.defaults import default_max_down_time, \
+    default_check_frequency, default_check_timeout, default_hash_algorithm
+from web_check.fingerprint import fingerprint
+from web_check.models import MD5Check, StringCheck, DiffCheck, RawCheck, \
+    SiteCheck, SitePage, NormalizationRule, CheckHistory
+from web_check.blobs import store_content, release_content
+from web_check.history import check_type_ids
+from web_check.normalize import rule_kinds, parse_selector, \
+    compile_substitutions, get_normalizer
+from web_check.region import get_region, sources
+from web_check.similarity import simhash, validate_threshold
+from web_check.sitemap import parse_sitemap, site_evaluators
+from web_check.text import get_text
+
+def validate_input(max_down_time, check_frequency, check_timeout):
+    """
+    Check's integers are given and that check_timeout is positive.
+
+    Negative max_down_time and check_frequency values have no purpose but are
+    still a valid input.  The check would run each time the script is called and
+    alert if a connection failed, values of 0 will have the same effect.
+    """
+    try:
+        max_down_time = int(max_down_time)
+    except ValueError:
+        print('Error: max_down_time {} given, must be an integer'.format(
+                                                                max_down_time))
+        exit(1)
+
+    try:
+        check_frequency = int(check_frequency)
+    except ValueError:
+        print('Error: check_frequency {} given, must be an integer'.format(
+                                                            check_frequency))
+        exit(1)
+
+    try:
+        check_timeout = int(check_timeout)
+    except ValueError:
+        print('Error: check_timeout {} given, must be an integer'.format(
+                                                                check_timeout))
+        exit(1)
+
+    if not check_timeout > 0:
+        print('Error: check-timeout {} given, must be greater than 0'.format(
+                                                                check_timeout))
+        exit(1)
+
+    return (max_down_time, check_frequency, check_timeout)
+
+def validate_priority(priority):
+    """
+    Check a priority given for a check is a positive number.  Returns it as a
+    float, or None if none was given.
+    """
+    if priority is None:
+        return None
+
+    try:
+        priority = float(priority)
+    except ValueError:
+        print('Error: priority {} given, must be a number'.format(priority))
+        exit(1)
+
+    if not priority > 0:
+        print('Error: priority {} given, must be greater than 0'.format(
+                                                                    priority))
+        exit(1)
+
+    return priority
+
+def add_md5(session, url, max_down_time, check_frequency, check_timeout,
+            hash_algorithm=default_hash_algorithm, similarity_threshold=None,
+            priority=None):
+    """
+    Add a database entry for a url to monitor the md5 hash of.  Returns message
+    relating to success.
+
+    With a similarity_threshold between 0 and 1 changes leaving the text at
+    least that similar to what was last alerted on are ignored.
+    """
+    if similarity_threshold is not None:
+        try:
+            similarity_threshold = validate_threshold(similarity_threshold)
+        except ValueError as e:
+            return 'Error: {}'.format(e)
+
+    max_down_time, check_frequency, check_timeout = validate_input(
+        max_down_time, check_frequency, check_timeout)
+    priority = validate_priority(priority)
+    import requests
+    try:
+        url_content = requests.get(url, timeout=check_timeout)
+    except requests.exceptions.ConnectionError:
+        return 'Error: Could not connect to chosen url {}'.format(url)
+    except requests.exceptions.MissingSchema as e:
+        return e
+    except requests.exceptions.InvalidSchema as e:
+        return e
+
+    if url_content.status_code != 200:
+        return 'Error: {} code from server'.format(url_content.status_code)
+
+    try:
+        text = get_text(url_content.text, get_normalizer(session, url))
+        current_hash = fingerprint(text.encode('utf-8'), hash_algorithm)
+    except:
+        return 'Error: Failed to hash response from {}'.format(url)
+    check = MD5Check(url=url,
+                current_hash=current_hash,
+                hash_algorithm=hash_algorithm,
+                simhash=None if similarity_threshold is None else simhash(text),
+                similarity_threshold=similarity_threshold,
+                failed_since=0,
+                max_down_time=max_down_time,
+                run_after=0,
+                check_frequency=check_frequency,
+                check_timeout=check_timeout,
+                priority=priority)
+    session.add(check)
+    try:
+        session.commit()
+    except sqlalchemy.exc.IntegrityError:
+        session.rollback()
+        return 'Error: An entry for {} is already in database'.format(url)
+    else:
+        return 'Added MD5 Check for {}'.format(url)
+
+def add_string(session, url, string, max_down_time, check_frequency,
+            check_timeout, priority=None):
+    """
+    Add a database entry for a url to monitor for a string.  Returns message
+    relating to success.
+    """
+    max_down_time, check_frequency, check_timeout = validate_input(
+        max_down_time, check_frequency, check_timeout)
+    priority = validate_priority(priority)
+    import requests
+    try:
+        url_content = requests.get(url, timeout=check_timeout)
+    except requests.exceptions.ConnectionError:
+        return 'Error: Could not connect to chosen url {}'.format(url)
+    except requests.exceptions.MissingSchema as e:
+        return e
+    except requests.exceptions.InvalidSchema as e:
+        return e
+
+    if url_content.status_code != 200:
+        return 'Error: {} code from server'.format(url_content.status_code)
+
+    string_exists = 0
+    if string in get_text(url_content.text, get_normalizer(session, url)):
+        string_exists = 1
+
+    check = StringCheck(url=url,
+                    string_to_match=string,
+                    present=string_exists,
+                    failed_since=0,
+                    max_down_time=max_down_time,
+                    run_after= 0,
+                    check_frequency=check_frequency,
+                    check_timeout=check_timeout,
+                    priority=priority)
+    session.add(check)
+    try:
+        session.commit()
+    except sqlalchemy.exc.IntegrityError:
+        session.rollback()
+        return 'Error: An entry for {} is already in database'.format(url)
+    else:
+        if string_exists:
+            print('{} is currently present, will alert if this changes'.format(
+                                                                    string))
+        else:
+            print('{} is currently not present, will alert if this changes'
+.format(string))
+
+        return 'Added String Check for {}'.format(url)
+
+def add_diff(session, url, max_down_time, check_frequency, check_timeout,
+            similarity_threshold=None, priority=None):
+    """
+    Add a database entry for a url to monitor for any text changes.
+    Returns message relating to success.
+
+    With a similarity_threshold between 0 and 1 changes leaving the text at
+    least that similar to what was last alerted on are ignored without being
+    diffed.
+    """
+    if similarity_threshold is not None:
+        try:
+            similarity_threshold = validate_threshold(similarity_threshold)
+        except ValueError as e:
+            return 'Error: {}'.format(e)
+
+    max_down_time, check_frequency, check_timeout = validate_input(
+        max_down_time, check_frequency, check_timeout)
+    priority = validate_priority(priority)
+    import requests
+    try:
+        url_content = requests.get(url, timeout=check_timeout)
+    except requests.exceptions.ConnectionError:
+        return 'Error: Could not connect to chosen url {}'.format(url)
+    except requests.exceptions.MissingSchema as e:
+        return e
+    except requests.exceptions.InvalidSchema as e:
+        return e
+
+    if url_content.status_code != 200:
+        return 'Error: {} code from server'.format(url_content.status_code)
+
+    text = get_text(url_content.text, get_normalizer(session, url))
+    check = DiffCheck(url=url,
+                    content_hash=store_content(session, text),
+                    simhash=None if similarity_threshold is None else simhash(
+                                                                        text),
+                    similarity_threshold=similarity_threshold,
+                    failed_since=0,
+                    max_down_time=max_down_time,
+                    run_after=0,
+                    check_frequency=check_frequency,
+                    check_timeout=check_timeout,
+                    priority=priority)
+    session.add(check)
+    try:
+        session.commit()
+    except sqlalchemy.exc.IntegrityError:
+        session.rollback()
+        return 'Error: An entry for {} is already in database'.format(url)
+    else:
+        return 'Added Diff Check for {}'.format(url)
+
+def add_raw(session, url, expression, max_down_time, check_frequency,
+            check_timeout, hash_algorithm=default_hash_algorithm,
+            start_marker=None, end_marker=None, selector=None, source='html',
+            priority=None):
+    """
+    Add a database entry for a url to monitor for a change using regex.
+    Returns message relating to success.
+
+    The expression runs against the part of the page between start_marker
+    and end_marker inside the element matching selector, any of which can be
+    left out.  Set source to text to match against the page with the html
+    stripped.
+    """
+    if source not in sources:
+        return 'Error: source must be either {}'.format(' or '.join(sources))
+    if selector:
+        try:
+            parse_selector(selector)
+        except ValueError as e:
+            return 'Error: {}'.format(e)
+
+    max_down_time, check_frequency, check_timeout = validate_input(
+        max_down_time, check_frequency, check_timeout)
+    priority = validate_priority(priority)
+    import requests
+    try:
+        url_content = requests.get(url, timeout=check_timeout)
+    except requests.exceptions.ConnectionError:
+        return 'Error: Could not connect to chosen url {}'.format(url)
+    except requests.exceptions.MissingSchema as e:
+        return e
+    except requests.exceptions.InvalidSchema as e:
+        return e
+
+    if url_content.status_code != 200:
+        return 'Error: {} code from server'.format(url_content.status_code)
+
+    try:
+        current_hash = fingerprint(url_content.content, hash_algorithm)
+    except:
+        return 'Error: Failed to hash response from {}'.format(url)
+
+    region = get_region(url_content.text, start_marker, end_marker, selector,
+                    source)
+    if region is None:
+        return 'Error: could not find the region to match on {}'.format(url)
+
+    try:
+        # Markers and selectors keep this to a small part of the page instead
+        # of expressions like <tags>Title(\w*)<tags>.*<tags>(.*?)<tags>
+        m = re.search(expression, region, re.S)
+    except:
+        # I couldn't catch the sre_constants.error I'm looking for so...
+        return 'Error: invalid regular expression'
+
+    try:
+        capture_groups = m.groups()
+    except AttributeError:
+        return 'Error: no matches for regular expression on {}'.format(url)
+
+    json_capture_groups = json.dumps(capture_groups)
+    check = RawCheck(url=url,
+                expression=expression,
+                current_hash=current_hash,
+                hash_algorithm=hash_algorithm,
+                capture_groups=json_capture_groups,
+                start_marker=start_marker,
+                end_marker=end_marker,
+                selector=selector,
+                source=source,
+                failed_since=0,
+                max_down_time=max_down_time,
+                run_after=0,
+                check_frequency=check_frequency,
+                check_timeout=check_timeout,
+                priority=priority)
+    session.add(check)
+    try:
+        session.commit()
+    except sqlalchemy.exc.IntegrityError:
+        session.rollback()
+        return 'Error: An entry for {} is already in database'.format(url)
+    else:
+        for count, capture_group in enumerate(capture_groups):
+            print('{} matched capture group {}, will alert if this changes'.format(
+                                                                    capture_group,
+                                                                    count))
+
+        return 'Added Raw Check for {}'.format(url)
+
+def add_site(session, url, evaluator, max_down_time, check_frequency,
+            check_timeout, string=None, priority=None,
+            similarity_threshold=None):
+    """
+    Add a database entry for a sitemap whose pages are each monitored using
+    evaluator, string is the text to look for with the string evaluator.
+    Returns message relating to success.
+
+    Pages aren't fetched here, the first run records their state and only
+    later runs alert.  similarity_threshold applies to each page as it does
+    to md5 and diff checks.
+    """
+    if evaluator not in site_evaluators:
+        return 'Error: evaluator must be either {}'.format(
+                                                ', '.join(site_evaluators))
+    if evaluator == 'string' and not string:
+        return 'Error: string evaluator needs a string to match'
+    if similarity_threshold is not None:
+        if evaluator == 'string':
+            return 'Error: similarity threshold only applies to the md5 and \
+diff evaluators'
+        try:
+            similarity_threshold = validate_threshold(similarity_threshold)
+        except ValueError as e:
+            return 'Error: {}'.format(e)
+
+    max_down_time, check_frequency, check_timeout = validate_input(
+        max_down_time, check_frequency, check_timeout)
+    priority = validate_priority(priority)
+    import requests
+    try:
+        url_content = requests.get(url, timeout=check_timeout)
+    except requests.exceptions.ConnectionError:
+        return 'Error: Could not connect to chosen url {}'.format(url)
+    except requests.exceptions.MissingSchema as e:
+        return e
+    except requests.exceptions.InvalidSchema as e:
+        return e
+
+    if url_content.status_code != 200:
+        return 'Error: {} code from server'.format(url_content.status_code)
+
+    try:
+        is_index, entries = parse_sitemap(url_content.content)
+    except ValueError as e:
+        return 'Error: {}'.format(e)
+
+    check = SiteCheck(url=url,
+                evaluator=evaluator,
+                string_to_match=string if evaluator == 'string' else None,
+                similarity_threshold=similarity_threshold,
+                last_synced=0,
+                failed_since=0,
+                max_down_time=max_down_time,
+                run_after=0,
+                check_frequency=check_frequency,
+                check_timeout=check_timeout,
+                priority=priority)
+    session.add(check)
+    try:
+        session.commit()
+    except sqlalchemy.exc.IntegrityError:
+        session.rollback()
+        return 'Error: An entry for {} is already in database'.format(url)
+    else:
+        print('{} lists {} {}, they will be fetched on the next run'.format(
+                    url, len(entries), 'sitemaps' if is_index else 'pages'))
+        return 'Added Site Check for {}'.format(url)
+
+def get_longest_md5(session):
+    longest_url = 3
+    longest_current_hash = 12
+    longest_old_hash = 8
+    longest_hash_algorithm = 14
+    longest_similarity_threshold = 20
+    longest_priority = 8
+    longest_failed_since = 12
+    longest_max_down_time = 14
+    longest_run_after = 9
+    longest_check_frequency = 15
+    longest_check_timeout = 13
+    for check in session.query(MD5Check).order_by(MD5Check.id):
+        if len(str(check.url)) > longest_url:
+            longest_url = len(str(check.url))
+        if len(str(check.current_hash)) > longest_current_hash:
+            longest_current_hash = len(str(check.current_hash))
+        if len(str(check.old_hash)) > longest_old_hash:
+            longest_old_hash = len(str(check.old_hash))
+        if len(str(check.hash_algorithm)) > longest_hash_algorithm:
+            longest_hash_algorithm = len(str(check.hash_algorithm))
+        if len(str(check.similarity_threshold)) > \
+                                                longest_similarity_threshold:
+            longest_similarity_threshold = len(str(
+                                                check.similarity_threshold))
+        if len(str(check.priority)) > longest_priority:
+            longest_priority = len(str(check.priority))
+        if len(str(check.failed_since)) > longest_failed_since:
+            longest_failed_since = len(str(check.failed_since))
+        if len(str(check.max_down_time)) > longest_max_down_time:
+            longest_max_down_time = len(str(check.max_down_time))
+        if len(str(check.run_after)) > longest_run_after:
+            longest_run_after = len(str(check.run_after))
+        if len(str(check.check_frequency)) > longest_check_frequency:
+            longest_check_frequency = len(str(check.check_frequency))
+        if len(str(check.check_timeout)) > longest_check_timeout:
+            longest_check_timeout = len(str(check.check_timeout))
+
+    return (('url', longest_url),
+        ('current_hash', longest_current_hash),
+        ('old_hash', longest_old_hash),
+        ('hash_algorithm', longest_hash_algorithm),
+        ('similarity_threshold', longest_similarity_threshold),
+        ('priority', longest_priority),
+        ('failed_since', longest_failed_since),
+        ('max_down_time', longest_max_down_time),
+        ('run_after', longest_run_after),
+        ('check_frequency', longest_check_frequency),
+        ('check_timeout', longest_check_timeout))
+
+def get_longest_string(session):
+    longest_url = 3
+    longest_string_to_match = 15
+    longest_present = 7
+    longest_priority = 8
+    longest_failed_since = 12
+    longest_max_down_time = 14
+    longest_run_after = 9
+    longest_check_frequency = 15
+    longest_check_timeout = 13
+    for check in session.query(StringCheck).order_by(StringCheck.id):
+        if len(str(check.url)) > longest_url:
+            longest_url = len(str(check.url))
+        if len(str(check.string_to_match)) > longest_string_to_match:
+            longest_string_to_match = len(str(check.string_to_match))
+        if len(str(check.present)) > longest_present:
+            longest_present = len(str(check.present))
+        if len(str(check.priority)) > longest_priority:
+            longest_priority = len(str(check.priority))
+        if len(str(check.failed_since)) > longest_failed_since:
+            longest_failed_since = len(str(check.failed_since))
+        if len(str(check.max_down_time)) > longest_max_down_time:
+            longest_max_down_time = len(str(check.max_down_time))
+        if len(str(check.run_after)) > longest_run_after:
+            longest_run_after = len(str(check.run_after))
+        if len(str(check.check_frequency)) > longest_check_frequency:
+            longest_check_frequency = len(str(check.check_frequency))
+        if len(str(check.check_timeout)) > longest_check_timeout:
+            longest_check_timeout = len(str(check.check_timeout))
+
+    return (('url', longest_url),
+        ('string_to_match', longest_string_to_match),
+        ('present', longest_present),
+        ('priority', longest_priority),
+        ('failed_since', longest_failed_since),
+        ('max_down_time', longest_max_down_time),
+        ('run_after', longest_run_after),
+        ('check_frequency', longest_check_frequency),
+        ('check_timeout', longest_check_timeout))
+
+def get_longest_diff(session):
+    """
+    Called by list_checks to check how much to pad the tables.
+    """
+    longest_url = 3
+    longest_content_hash = 12
+    longest_similarity_threshold = 20
+    longest_priority = 8
+    longest_failed_since = 12
+    longest_max_down_time = 14
+    longest_run_after = 9
+    longest_check_frequency = 15
+    longest_check_timeout = 13
+    for check in session.query(DiffCheck).order_by(DiffCheck.id):
+        if len(str(check.url)) > longest_url:
+            longest_url = len(str(check.url))
+        if len(str(check.content_hash)) > longest_content_hash:
+            longest_content_hash = len(str(check.content_hash))
+        if len(str(check.similarity_threshold)) > \
+                                                longest_similarity_threshold:
+            longest_similarity_threshold = len(str(
+                                                check.similarity_threshold))
+        if len(str(check.priority)) > longest_priority:
+            longest_priority = len(str(check.priority))
+        if len(str(check.failed_since)) > longest_failed_since:
+            longest_failed_since = len(str(check.failed_since))
+        if len(str(check.max_down_time)) > longest_max_down_time:
+            longest_max_down_time = len(str(check.max_down_time))
+        if len(str(check.run_after)) > longest_run_after:
+            longest_run_after = len(str(check.run_after))
+        if len(str(check.check_frequency)) > longest_check_frequency:
+            longest_check_frequency = len(str(check.check_frequency))
+        if len(str(check.check_timeout)) > longest_check_timeout:
+            longest_check_timeout = len(str(check.check_timeout))
+
+    return (('url', longest_url),
+        ('content_hash', longest_content_hash),
+        ('similarity_threshold', longest_similarity_threshold),
+        ('priority', longest_priority),
+        ('failed_since', longest_failed_since),
+        ('max_down_time', longest_max_down_time),
+        ('run_after', longest_run_after),
+        ('check_frequency', longest_check_frequency),
+        ('check_timeout', longest_check_timeout))
+
+def get_longest_raw(session):
+    longest_url = 3
+    longest_expression = 10
+    longest_current_hash = 12
+    longest_capture_groups = 14
+    longest_hash_algorithm = 14
+    longest_start_marker = 12
+    longest_end_marker = 10
+    longest_selector = 8
+    longest_source = 6
+    longest_priority = 8
+    longest_failed_since = 12
+    longest_max_down_time = 14
+    longest_run_after = 9
+    longest_check_frequency = 15
+    longest_check_timeout = 13
+    for check in session.query(RawCheck).order_by(RawCheck.id):
+        if len(str(check.url)) > longest_url:
+            longest_url = len(str(check.url))
+        if len(str(check.expression)) > longest_expression:
+            longest_expression = len(str(check.expression))
+        if len(str(check.current_hash)) > longest_current_hash:
+            longest_current_hash = len(str(check.current_hash))
+        if len(str(check.capture_groups)) > longest_capture_groups:
+            longest_capture_groups = len(str(check.capture_groups))
+        if len(str(check.hash_algorithm)) > longest_hash_algorithm:
+            longest_hash_algorithm = len(str(check.hash_algorithm))
+        if len(str(check.start_marker)) > longest_start_marker:
+            longest_start_marker = len(str(check.start_marker))
+        if len(str(check.end_marker)) > longest_end_marker:
+            longest_end_marker = len(str(check.end_marker))
+        if len(str(check.selector)) > longest_selector:
+            longest_selector = len(str(check.selector))
+        if len(str(check.source)) > longest_source:
+            longest_source = len(str(check.source))
+        if len(str(check.priority)) > longest_priority:
+            longest_priority = len(str(check.priority))
+        if len(str(check.failed_since)) > longest_failed_since:
+            longest_failed_since = len(str(check.failed_since))
+        if len(str(check.max_down_time)) > longest_max_down_time:
+            longest_max_down_time = len(str(check.max_down_time))
+        if len(str(check.run_after)) > longest_run_after:
+            longest_run_after = len(str(check.run_after))
+        if len(str(check.check_frequency)) > longest_check_frequency:
+            longest_check_frequency = len(str(check.check_frequency))
+        if len(str(check.check_timeout)) > longest_check_timeout:
+            longest_check_timeout = len(str(check.check_timeout))
+
+    return (('url', longest_url),
+        ('expression', longest_expression),
+        ('current_hash', longest_current_hash),
+        ('capture_groups', longest_capture_groups),
+        ('hash_algorithm', longest_hash_algorithm),
+        ('start_marker', longest_start_marker),
+        ('end_marker', longest_end_marker),
+        ('selector', longest_selector),
+        ('source', longest_source),
+        ('priority', longest_priority),
+        ('failed_since', longest_failed_since),
+        ('max_down_time', longest_max_down_time),
+        ('run_after', longest_run_after),
+        ('check_frequency', longest_check_frequency),
+        ('check_timeout', longest_check_timeout))
+
+def get_longest_site(session):
+    longest_url = 3
+    longest_evaluator = 9
+    longest_string_to_match = 15
+    longest_similarity_threshold = 20
+    longest_pages = 5
+    longest_last_synced = 11
+    longest_priority = 8
+    longest_failed_since = 12
+    longest_max_down_time = 14
+    longest_run_after = 9
+    longest_check_frequency = 15
+    longest_check_timeout = 13
+    for check, pages in get_sites(session):
+        if len(str(check.url)) > longest_url:
+            longest_url = len(str(check.url))
+        if len(str(check.evaluator)) > longest_evaluator:
+            longest_evaluator = len(str(check.evaluator))
+        if len(str(check.string_to_match)) > longest_string_to_match:
+            longest_string_to_match = len(str(check.string_to_match))
+        if len(str(check.similarity_threshold)) > \
+                                                longest_similarity_threshold:
+            longest_similarity_threshold = len(str(
+                                                check.similarity_threshold))
+        if len(str(pages)) > longest_pages:
+            longest_pages = len(str(pages))
+        if len(str(check.last_synced)) > longest_last_synced:
+            longest_last_synced = len(str(check.last_synced))
+        if len(str(check.priority)) > longest_priority:
+            longest_priority = len(str(check.priority))
+        if len(str(check.failed_since)) > longest_failed_since:
+            longest_failed_since = len(str(check.failed_since))
+        if len(str(check.max_down_time)) > longest_max_down_time:
+            longest_max_down_time = len(str(check.max_down_time))
+        if len(str(check.run_after)) > longest_run_after:
+            longest_run_after = len(str(check.run_after))
+        if len(str(check.check_frequency)) > longest_check_frequency:
+            longest_check_frequency = len(str(check.check_frequency))
+        if len(str(check.check_timeout)) > longest_check_timeout:
+            longest_check_timeout = len(str(check.check_timeout))
+
+    return (('url', longest_url),
+        ('evaluator', longest_evaluator),
+        ('string_to_match', longest_string_to_match),
+        ('similarity_threshold', longest_similarity_threshold),
+        ('pages', longest_pages),
+        ('last_synced', longest_last_synced),
+        ('priority', longest_priority),
+        ('failed_since', longest_failed_since),
+        ('max_down_time', longest_max_down_time),
+        ('run_after', longest_run_after),
+        ('check_frequency', longest_check_frequency),
+        ('check_timeout', longest_check_timeout))
+
+def get_sites(session):
+    """Returns (check, number of pages) for every SiteCheck"""
+    pages = sqlalchemy.func.count(SitePage.id)
+    return session.query(SiteCheck, pages).outerjoin(SitePage,
+                        sqlalchemy.and_(SitePage.site_id == SiteCheck.id,
+                                    SitePage.kind == 'page')).group_by(
+                                        SiteCheck.id).order_by(SiteCheck.id)
+
+def get_longest_rule(session):
+    longest_id = 2
+    longest_target = 6
+    longest_kind = 4
+    longest_pattern = 7
+    longest_replacement = 11
+    for rule in session.query(NormalizationRule).order_by(
+                                                    NormalizationRule.id):
+        if len(str(rule.id)) > longest_id:
+            longest_id = len(str(rule.id))
+        if len(str(rule.target)) > longest_target:
+            longest_target = len(str(rule.target))
+        if len(str(rule.kind)) > longest_kind:
+            longest_kind = len(str(rule.kind))
+        if len(str(rule.pattern)) > longest_pattern:
+            longest_pattern = len(str(rule.pattern))
+        if len(str(rule.replacement)) > longest_replacement:
+            longest_replacement = len(str(rule.replacement))
+
+    return (('id', longest_id),
+        ('target', longest_target),
+        ('kind', longest_kind),
+        ('pattern', longest_pattern),
+        ('replacement', longest_replacement))
+
+def list_checks(session):
+    """
+    List all of the checks from the database in a table like format.
+    """
+    table_skel = '|'
+    columns = []
+    arguments = []
+    for column, longest_entry in get_longest_md5(session):
+        table_skel += (' {{: <{}}} |'.format(longest_entry))
+        columns.append(column)
+        arguments.append('row.{}'.format(column))
+
+    print('{} Checks:'.format('MD5Check'))
+    print(table_skel.format(*columns))
+    for check in session.query(MD5Check).order_by(MD5Check.id):
+        print(table_skel.format(str(check.url),
+                        str(check.current_hash),
+                        str(check.old_hash),
+                        str(check.hash_algorithm),
+                        str(check.similarity_threshold),
+                        str(check.priority),
+                        str(check.failed_since),
+                        str(check.max_down_time),
+                        str(check.run_after),
+                        str(check.check_frequency),
+                        str(check.check_timeout)))
+
+    table_skel = '|'
+    columns = []
+    arguments = []
+    for column, longest_entry in get_longest_string(session):
+        table_skel += (' {{: <{}}} |'.format(longest_entry))
+        columns.append(column)
+        arguments.append('row.{}'.format(column))
+
+    print('{} Checks:'.format('StringCheck'))
+    print(table_skel.format(*columns))
+    for check in session.query(StringCheck).order_by(StringCheck.id):
+        print(table_skel.format(str(check.url),
+                        str(check.string_to_match),
+                        str(check.present),
+                        str(check.priority),
+                        str(check.failed_since),
+                        str(check.max_down_time),
+                        str(check.run_after),
+                        str(check.check_frequency),
+                        str(check.check_timeout)))
+
+    table_skel = '|'
+    columns = []
+    arguments = []
+    for column, longest_entry in get_longest_diff(session):
+        table_skel += (' {{: <{}}} |'.format(longest_entry))
+        columns.append(column)
+        arguments.append('row.{}'.format(column))
+
+    print('{} Checks:'.format('DiffCheck'))
+    print(table_skel.format(*columns))
+    for check in session.query(DiffCheck).order_by(DiffCheck.id):
+        print(table_skel.format(str(check.url),
+                            str(check.content_hash),
+                            str(check.similarity_threshold),
+                            str(check.priority),
+                            str(check.failed_since),
+                            str(check.max_down_time),
+                            str(check.run_after),
+                            str(check.check_frequency),
+                            str(check.check_timeout)))
+
+    table_skel = '|'
+    columns = []
+    arguments = []
+    for column, longest_entry in get_longest_raw(session):
+        table_skel += (' {{: <{}}} |'.format(longest_entry))
+        columns.append(column)
+        arguments.append('row.{}'.format(column))
+
+    print('{} Checks:'.format('RawCheck'))
+    print(table_skel.format(*columns))
+    for check in session.query(RawCheck).order_by(RawCheck.id):
+        print(table_skel.format(str(check.url),
+                            str(check.expression),
+                            str(check.current_hash),
+                            str(check.capture_groups),
+                            str(check.hash_algorithm),
+                            str(check.start_marker),
+                            str(check.end_marker),
+                            str(check.selector),
+                            str(check.source),
+                            str(check.priority),
+                            str(check.failed_since),
+                            str(check.max_down_time),
+                            str(check.run_after),
+                            str(check.check_frequency),
+                            str(check.check_timeout)))
+
+    table_skel = '|'
+    columns = []
+    for column, longest_entry in get_longest_site(session):
+        table_skel += (' {{: <{}}} |'.format(longest_entry))
+        columns.append(column)
+
+    print('{} Checks:'.format('SiteCheck'))
+    print(table_skel.format(*columns))
+    for check, pages in get_sites(session):
+        print(table_skel.format(str(check.url),
+                            str(check.evaluator),
+                            str(check.string_to_match),
+                            str(check.similarity_threshold),
+                            str(pages),
+                            str(check.last_synced),
+                            str(check.priority),
+                            str(check.failed_since),
+                            str(check.max_down_time),
+                            str(check.run_after),
+                            str(check.check_frequency),
+                            str(check.check_timeout)))
+
+    table_skel = '|'
+    columns = []
+    for column, longest_entry in get_longest_rule(session):
+        table_skel += (' {{: <{}}} |'.format(longest_entry))
+        columns.append(column)
+
+    print('{}:'.format('Normalization Rules'))
+    print(table_skel.format(*columns))
+    for rule in session.query(NormalizationRule).order_by(
+                                                    NormalizationRule.id):
+        print(table_skel.format(str(rule.id),
+                            str(rule.target),
+                            str(rule.kind),
+                            str(rule.pattern),
+                            str(rule.replacement)))
+
+    return ''
+
+def add_rule(session, kind, pattern, target, replacement=''):
+    """
+    Add a normalization rule applied to the text of md5, string and diff
+    checks before it is compared.  target is either a host, to apply it to
+    every check on that host, or the url of a single check.  Returns message
+    relating to success.
+
+    regex rules replace every match of pattern with replacement, exclude rules
+    drop elements matching a simple selector such as div.advert or #csrf.
+    """
+    if kind == 'regex':
+        try:
+            compile_substitutions((pattern,))
+        except re.error as e:
+            return 'Error: invalid regular expression {}: {}'.format(pattern, e)
+    elif kind == 'exclude':
+        if replacement:
+            return 'Error: exclude rules don\'t take a replacement'
+        try:
+            parse_selector(pattern)
+        except ValueError as e:
+            return 'Error: {}'.format(e)
+    else:
+        return 'Chose either {} rule'.format(' or '.join(rule_kinds))
+
+    rule = NormalizationRule(target=target,
+                        kind=kind,
+                        pattern=pattern,
+                        replacement=replacement)
+    session.add(rule)
+    session.commit()
+    return 'Added {} rule {} for {}, checks will alert once if it changes \
+their content'.format(kind, rule.id, target)
+
+def delete_rule(session, rule_id):
+    rule = session.query(NormalizationRule).filter(
+                                            NormalizationRule.id == rule_id)
+    if rule.delete():
+        session.commit()
+        return 'Rule {} removed'.format(rule_id)
+
+    return 'There is no rule {}'.format(rule_id)
+
+def delete_check(session, check_type, url):
+    if check_type == 'md5':
+        model = MD5Check
+    elif check_type == 'string':
+        model = StringCheck
+    elif check_type == 'diff':
+        model = DiffCheck
+    elif check_type == 'raw':
+        model = RawCheck
+    elif check_type == 'site':
+        model = SiteCheck
+    else:
+        return 'Chose either md5, string, diff, raw or site check'
+
+    check_ids = [row.id for row in session.query(model.id).filter(
+                                                            model.url == url)]
+    content_hashes = []
+    if model is DiffCheck:
+        content_hashes = [row.content_hash for row in session.query(
+                        DiffCheck.content_hash).filter(DiffCheck.url == url)]
+    elif model is SiteCheck and check_ids:
+        pages = session.query(SitePage).filter(
+                                        SitePage.site_id.in_(check_ids))
+        content_hashes = [row.content_hash for row in pages.with_entities(
+                                                        SitePage.content_hash)]
+        pages.delete(synchronize_session=False)
+    if session.query(model).filter(model.url == url).delete():
+        release_content(session, content_hashes)
+        session.query(CheckHistory).filter(
+                    CheckHistory.check_type == check_type_ids[check_type],
+                    CheckHistory.check_id.in_(check_ids)).delete(
+                                                synchronize_session=False)
+        session.commit()
+        return '{} check for {} removed'.format(check_type, url)
+
+    return 'There is no {} check for {}'.format(check_type, url)
+
+def import_from_file(session, import_file,
+                    hash_algorithm=default_hash_algorithm):
+    """
+    Add's new database entrys from a file
+    """
+    error_message = 'Import failed: {} is not formatted correctly'
+    with open(import_file, 'r') as f:
+        for line in f:
+            line = line.split('#', 1)[0].rstrip()
+            if not line:
+                continue
+            try:
+                check_type, data = line.split('|', 1)
+            except ValueError:
+                return error_message.format(line)
+
+            max_down_time = default_max_down_time
+            check_frequency = default_check_frequency
+            check_timeout = default_check_timeout
+            if check_type == 'md5':
+                # There are two accepted line formats:
+                # check_type|url|max_down_time|check_frequency|check_timeout
+                # and check_type|url
+                if '|' in data:
+                    try:
+                        url, max_down_time, check_frequency, check_timeout\
+                        = data.split('|')
+                    except ValueError:
+                        return error_message.format(line)
+
+                else:
+                    url = data
+
+                print(add_md5(session, url, max_down_time, check_frequency,
+                        check_timeout, hash_algorithm))
+            elif check_type == 'string':
+                # There are two accepted line formats:
+                # check_type|url|string_to_check|max_down_time|check_frequency
+                # |check_timeout
+                # and check_type|url
+                try:
+                    string_to_check, data = data.split('|', 1)
+                except ValueError:
+                    return error_message.format(line)
+                if '|' in data:
+                    try:
+                        url, max_down_time, check_frequency, check_timeout\
+                        = data.split('|')
+                    except ValueError:
+                        return error_message.format(line)
+
+                else:
+                    url = data
+
+                print(add_string(session, url, string_to_check, max_down_time,
+                        check_frequency, check_timeout))
+            elif check_type == 'diff':
+                # There are two accepted line formats:
+                # check_type|url|max_down_time|check_frequency|check_timeout
+                # and check_type|url
+                if '|' in data:
+                    try:
+                        url, max_down_time, check_frequency, check_timeout\
+                        = data.split('|')
+                    except ValueError:
+                        return error_message.format(line)
+
+                else:
+                    url = data
+
+                print(add_diff(session, url, max_down_time, check_frequency,
+                        check_timeout))
+            elif check_type == 'raw':
+                try:
+                    expression, data = data.split('|', 1)
+                except ValueError:
+                    return error_message.format(line)
+                if '|' in data:
+                    try:
+                        url, max_down_time, check_frequency, check_timeout\
+                        = data.split('|')
+                    except ValueError:
+                        return error_message.format(line)
+
+                else:
+                    url = data
+
+                print(add_raw(session, url, expression, max_down_time,
+                        check_frequency, check_timeout, hash_algorithm))
+            elif check_type == 'site':
+                # check_type|evaluator|url with the same optional fields as
+                # the others, the string evaluator takes
+                # check_type|string|string_to_check|url
+                try:
+                    evaluator, data = data.split('|', 1)
+                except ValueError:
+                    return error_message.format(line)
+                string_to_check = None
+                if evaluator == 'string':
+                    try:
+                        string_to_check, data = data.split('|', 1)
+                    except ValueError:
+                        return error_message.format(line)
+                if '|' in data:
+                    try:
+                        url, max_down_time, check_frequency, check_timeout\
+                        = data.split('|')
+                    except ValueError:
+                        return error_message.format(line)
+
+                else:
+                    url = data
+
+                print(add_site(session, url, evaluator, max_down_time,
+                        check_frequency, check_timeout, string_to_check))
+            else:
+                return error_message.format(line)
+
+    return ''
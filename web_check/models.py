@@ -0,0 +1,298 @@
+import re
+
+import sqlalchemy
+from sqlalchemy import Column, Integer, SmallInteger, BigInteger, Float, \
+    String, Index, event
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import sessionmaker, deferred
+
+Base = declarative_base()
+
+class MD5Check(Base):
+    __tablename__ = 'md5s'
+    check_type = 'md5'
+    id = Column(Integer, primary_key=True)
+    url = Column(String, unique=True)
+    current_hash = Column(String)
+    old_hash = Column(String)
+    hash_algorithm = Column(String)
+    # SimHash of the content last alerted on, changes at least
+    # similarity_threshold similar to it don't alert
+    simhash = Column(BigInteger)
+    similarity_threshold = Column(Float)
+    failed_since = Column(Integer)
+    max_down_time = Column(Integer)
+    run_after = Column(Integer)
+    check_frequency = Column(Integer)
+    check_timeout = Column(Integer)
+    # Multiplies how overdue the check counts as when runs have a time budget
+    priority = Column(Float)
+    def __repr__(self):
+        return '<url(url={}, current_hash={}, old_hash={},\
+hash_algorithm={}, failed_since={}, max_down_time={}, run_after={},\
+check_frequency={}, check_timeout{})>'.format(
+                    self.url,
+                    self.current_hash,
+                    self.old_hash,
+                    self.hash_algorithm,
+                    self.failed_since,
+                    self.max_down_time,
+                    self.run_after,
+                    self.check_frequency,
+                    self.check_timeout)
+
+class StringCheck(Base):
+    __tablename__ = 'strings'
+    check_type = 'string'
+    id = Column(Integer, primary_key=True)
+    url = Column(String, unique=True)
+    string_to_match = Column(String)
+    present = Column(Integer)
+    failed_since = Column(Integer)
+    max_down_time = Column(Integer)
+    run_after = Column(Integer)
+    check_frequency = Column(Integer)
+    check_timeout = Column(Integer)
+    priority = Column(Float)
+    def __repr__(self):
+        return '<url(url={}, string_to_match={}, present={},\
+failed_since={}, max_down_time={}, run_after={},\
+check_frequency={}, check_timeout{})>'.format(
+                    self.url,
+                    self.string_to_match,
+                    self.present,
+                    self.failed_since,
+                    self.max_down_time,
+                    self.run_after,
+                    self.check_frequency,
+                    self.check_timeout)
+
+class DiffCheck(Base):
+    __tablename__ = 'diffs'
+    check_type = 'diff'
+    id = Column(Integer, primary_key=True)
+    url = Column(String, unique=True)
+    # Only set for checks stored before content_blobs, only loaded when needed
+    current_content = deferred(Column(String))
+    content_hash = Column(String)
+    simhash = Column(BigInteger)
+    similarity_threshold = Column(Float)
+    failed_since = Column(Integer)
+    max_down_time = Column(Integer)
+    run_after = Column(Integer)
+    check_frequency = Column(Integer)
+    check_timeout = Column(Integer)
+    priority = Column(Float)
+    def __repr__(self):
+        return '<url(url={}, content_hash={}, failed_since=\
+{}, max_down_time={}, run_after={},\
+check_frequency={}, check_timeout{})>'.format(
+                        self.url,
+                        self.content_hash,
+                        self.failed_since,
+                        self.max_down_time,
+                        self.run_after,
+                        self.check_frequency,
+                        self.check_timeout)
+
+class RawCheck(Base):
+    __tablename__ = 'raws'
+    check_type = 'raw'
+    id = Column(Integer, primary_key=True)
+    url = Column(String, unique=True)
+    expression = Column(String)
+    current_hash = Column(String)
+    capture_groups = Column(String)
+    hash_algorithm = Column(String)
+    # Narrow the page before the expression runs, see web_check.region
+    start_marker = Column(String)
+    end_marker = Column(String)
+    selector = Column(String)
+    source = Column(String)
+    failed_since = Column(Integer)
+    max_down_time = Column(Integer)
+    run_after = Column(Integer)
+    check_frequency = Column(Integer)
+    check_timeout = Column(Integer)
+    priority = Column(Float)
+    def __repr__(self):
+        return '<url(url={}, expression={}, current_hash={},\
+hash_algorithm={}, capture_groups={}, start_marker={}, end_marker={},\
+selector={}, source={}, failed_since={}, max_down_time={},\
+run_after={}, check_frequency={}, check_timeout{})>'.format(
+                    self.url,
+                    self.expression,
+                    self.current_hash,
+                    self.hash_algorithm,
+                    self.capture_groups,
+                    self.start_marker,
+                    self.end_marker,
+                    self.selector,
+                    self.source,
+                    self.failed_since,
+                    self.max_down_time,
+                    self.run_after,
+                    self.check_frequency,
+                    self.check_timeout)
+
+class SiteCheck(Base):
+    __tablename__ = 'sites'
+    check_type = 'site'
+    id = Column(Integer, primary_key=True)
+    url = Column(String, unique=True)
+    evaluator = Column(String)
+    string_to_match = Column(String)
+    # Applies to each page with the md5 and diff evaluators
+    similarity_threshold = Column(Float)
+    last_synced = Column(Integer)
+    failed_since = Column(Integer)
+    max_down_time = Column(Integer)
+    run_after = Column(Integer)
+    check_frequency = Column(Integer)
+    check_timeout = Column(Integer)
+    priority = Column(Float)
+    def __repr__(self):
+        return '<url(url={}, evaluator={}, string_to_match={},\
+last_synced={}, failed_since={}, max_down_time={}, run_after={},\
+check_frequency={}, check_timeout{})>'.format(
+                    self.url,
+                    self.evaluator,
+                    self.string_to_match,
+                    self.last_synced,
+                    self.failed_since,
+                    self.max_down_time,
+                    self.run_after,
+                    self.check_frequency,
+                    self.check_timeout)
+
+class SitePage(Base):
+    """
+    A page or child sitemap listed in a SiteCheck's sitemap, sitemap is the
+    url of the sitemap that listed it.  Only the columns for the site's
+    evaluator are used.
+    """
+    __tablename__ = 'site_pages'
+    __table_args__ = (Index('ix_site_pages_sitemap', 'site_id', 'sitemap'),)
+    id = Column(Integer, primary_key=True)
+    site_id = Column(Integer)
+    sitemap = Column(String)
+    kind = Column(String)
+    url = Column(String)
+    lastmod = Column(String)
+    current_hash = Column(String)
+    old_hash = Column(String)
+    hash_algorithm = Column(String)
+    content_hash = Column(String)
+    simhash = Column(BigInteger)
+    present = Column(Integer)
+    def __repr__(self):
+        return '<page(site_id={}, sitemap={}, kind={}, url={}, lastmod={})>\
+'.format(self.site_id, self.sitemap, self.kind, self.url, self.lastmod)
+
+check_models = (MD5Check, StringCheck, DiffCheck, RawCheck, SiteCheck)
+
+# Paused checks are scheduled this far ahead so they are never due and the
+# queries for due checks don't need another condition
+paused_run_after = 2 ** 62
+
+class NormalizationRule(Base):
+    __tablename__ = 'normalization_rules'
+    id = Column(Integer, primary_key=True)
+    target = Column(String, index=True)
+    kind = Column(String)
+    pattern = Column(String)
+    replacement = Column(String)
+    def __repr__(self):
+        return '<rule(target={}, kind={}, pattern={}, replacement={})>'.format(
+                    self.target,
+                    self.kind,
+                    self.pattern,
+                    self.replacement)
+
+class ContentBlob(Base):
+    """
+    Extracted text shared by every DiffCheck with identical content, keyed by
+    its hash and deleted once nothing references it.
+    """
+    __tablename__ = 'content_blobs'
+    key = Column(String, primary_key=True)
+    content = deferred(Column(String))
+    refcount = Column(Integer)
+    def __repr__(self):
+        return '<blob(key={}, refcount={})>'.format(self.key, self.refcount)
+
+class CheckHistory(Base):
+    """
+    One row per fetch.  Everything is stored as an integer so rows stay small,
+    check_type uses the codes in web_check.history, latency is in
+    milliseconds, size in bytes and fingerprint is the first 64 bits of the
+    content hash.
+    """
+    __tablename__ = 'check_history'
+    __table_args__ = (Index('ix_check_history_check', 'check_type',
+                                                    'check_id', 'time'),)
+    id = Column(Integer, primary_key=True)
+    check_type = Column(SmallInteger)
+    check_id = Column(Integer)
+    time = Column(Integer, index=True)
+    status = Column(SmallInteger)
+    latency = Column(Integer)
+    size = Column(Integer)
+    fingerprint = Column(BigInteger)
+    changed = Column(SmallInteger)
+    def __repr__(self):
+        return '<history(check_type={}, check_id={}, time={}, status={},\
+latency={}, size={}, fingerprint={}, changed={})>'.format(
+                    self.check_type,
+                    self.check_id,
+                    self.time,
+                    self.status,
+                    self.latency,
+                    self.size,
+                    self.fingerprint,
+                    self.changed)
+
+def upgrade_schema(engine):
+    """
+    Add any columns missing from tables created by an older version.
+
+    New columns are always nullable so existing rows are left with NULL, code
+    reading them treats that as the value older versions implied.
+    """
+    inspector = sqlalchemy.inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        existing = set(column['name'] for column in
+                                        inspector.get_columns(table.name))
+        for column in table.columns:
+            if column.name in existing:
+                continue
+
+            engine.execute('ALTER TABLE {} ADD COLUMN {} {}'.format(
+                                table.name, column.name,
+                                column.type.compile(dialect=engine.dialect)))
+
+def regexp(pattern, value):
+    """Backs sqlite's REGEXP operator, which has no built in implementation"""
+    return value is not None and re.search(pattern, value) is not None
+
+def connect(database_location):
+    """
+    Input the location of a sqlite database, it is created if it doesn't
+    exist.  Returns a session bound to it.
+
+    Objects aren't expired on commit, nothing else writes to the database
+    during a run so reloading every check after each commit is wasted work.
+
+    Raises sqlalchemy.exc.OperationalError if the database can't be opened.
+    """
+    engine = sqlalchemy.create_engine('sqlite:///{}'.format(
+                                                    database_location))
+
+    @event.listens_for(engine, 'connect')
+    def add_functions(dbapi_connection, connection_record):
+        dbapi_connection.create_function('regexp', 2, regexp)
+
+    Base.metadata.create_all(engine)
+    upgrade_schema(engine)
+    Session = sessionmaker(bind=engine, expire_on_commit=False)
+    return Session()
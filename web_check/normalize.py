@@ -0,0 +1,318 @@
+import re
+from collections import namedtuple
+from urllib.parse import urlparse
+
+from web_check.models import NormalizationRule
+
+# Plain copies of NormalizationRule rows so compiled rules outlive the session
+Rule = namedtuple('Rule', ('kind', 'pattern', 'replacement'))
+rule_kinds = ('regex', 'exclude')
+selector_expression = re.compile(r'^([\w-]*)((?:[.#][\w-]+)*)$')
+void_tags = set(('area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+                'link', 'meta', 'param', 'source', 'track', 'wbr'))
+# Elements whose end tag may be left out and the start tags that close them
+paragraph_ends = set(('address', 'article', 'aside', 'blockquote', 'dd',
+                'details', 'div', 'dl', 'dt', 'fieldset', 'figcaption',
+                'figure', 'footer', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+                'header', 'hgroup', 'hr', 'li', 'main', 'menu', 'nav', 'ol',
+                'p', 'pre', 'section', 'table', 'ul'))
+implied_ends = {
+    'p': paragraph_ends,
+    'li': set(('li',)),
+    'dt': set(('dt', 'dd')),
+    'dd': set(('dt', 'dd')),
+    'option': set(('option', 'optgroup')),
+    'optgroup': set(('optgroup',)),
+    'rt': set(('rt', 'rp')),
+    'rp': set(('rt', 'rp')),
+    'td': set(('td', 'th', 'tr', 'thead', 'tbody', 'tfoot')),
+    'th': set(('td', 'th', 'tr', 'thead', 'tbody', 'tfoot')),
+    'tr': set(('tr', 'thead', 'tbody', 'tfoot')),
+    'thead': set(('tbody', 'tfoot')),
+    'tbody': set(('tbody', 'tfoot')),
+    }
+
+def parse_selector(selector):
+    """
+    Input a simple css selector such as div, .advert, #csrf or span.views.
+    Returns (tag, id, classes), tag and id are None when not given.
+
+    Raises ValueError for anything more complicated.
+    """
+    m = selector_expression.match(selector.strip())
+    if not m or not selector.strip():
+        raise ValueError('Unsupported selector {}, use tag, .class, #id or a \
+combination like tag.class'.format(selector))
+
+    tag = m.group(1).lower() or None
+    element_id = None
+    classes = set()
+    for part in re.findall(r'[.#][\w-]+', m.group(2)):
+        if part[0] == '#':
+            element_id = part[1:]
+        else:
+            classes.add(part[1:])
+
+    return (tag, element_id, classes)
+
+def selector_matches(selector, tag, attrs):
+    """
+    Input a parsed selector and a start tag.  Returns True if it matches.
+    """
+    selector_tag, element_id, classes = selector
+    if selector_tag and selector_tag != tag:
+        return False
+
+    attrs = dict(attrs)
+    if element_id and attrs.get('id') != element_id:
+        return False
+
+    if classes and not classes.issubset((attrs.get('class') or '').split()):
+        return False
+
+    return True
+
+class OpenElements(object):
+    """
+    The elements open at the current point of a parse.
+
+    Elements whose end tag may be left out, such as li, p and td, are closed
+    when a start tag that implies their end arrives or when an element they
+    are inside closes.  End tags for elements that aren't open are ignored.
+    """
+    def __init__(self):
+        self.tags = []
+
+    def start(self, tag):
+        """
+        Record a start tag.  Returns how many elements are open above it, an
+        element that isn't void is opened one deeper.
+        """
+        while self.tags and tag in implied_ends.get(self.tags[-1], ()):
+            self.tags.pop()
+        depth = len(self.tags)
+        if tag not in void_tags:
+            self.tags.append(tag)
+        return depth
+
+    def end(self, tag):
+        """
+        Record an end tag.  Returns the depth of the element it closes, along
+        with everything opened inside it, or 0 if no such element is open.
+        """
+        for index in range(len(self.tags) - 1, -1, -1):
+            if self.tags[index] == tag:
+                del self.tags[index:]
+                return index + 1
+
+        return 0
+
+def compile_substitutions(patterns):
+    """
+    Input regular expressions.  Returns (expression, index) pairs to apply in
+    turn, index is the pattern an expression came from or None if it
+    combines several.
+
+    Consecutive patterns without groups of their own are combined into one
+    expression with a named group per pattern so the text is only scanned
+    once for all of them.  Any other pattern gets an expression to itself,
+    wrapping it would clash with the group names of other patterns and
+    renumber its backreferences.
+
+    Raises re.error if any of them are invalid.
+    """
+    steps = []
+    batch = []
+
+    def add_batch():
+        if len(batch) == 1:
+            steps.append((re.compile(batch[0][1]), batch[0][0]))
+        elif batch:
+            steps.append((re.compile('|'.join('(?P<wc_rule_{}>{})'.format(
+                                index, pattern) for index, pattern in batch)),
+                        None))
+        del batch[:]
+
+    for index, pattern in enumerate(patterns):
+        expression = re.compile(pattern)
+        try:
+            # Patterns with global flags can't be placed inside a group
+            re.compile('(?:{})'.format(pattern))
+        except re.error:
+            combinable = False
+        else:
+            combinable = not expression.groups
+        if combinable:
+            batch.append((index, pattern))
+        else:
+            add_batch()
+            steps.append((expression, index))
+    add_batch()
+    return steps
+
+excluding_parser_class = None
+
+def get_excluding_parser_class():
+    """
+    Returns a subclass of html2text.HTML2Text that drops elements matching
+    its selectors while the html is parsed, so exclusion doesn't need a
+    separate pass over the document.
+    """
+    global excluding_parser_class
+    if excluding_parser_class is not None:
+        return excluding_parser_class
+
+    import html2text
+
+    class ExcludingHTML2Text(html2text.HTML2Text):
+        def __init__(self, selectors):
+            html2text.HTML2Text.__init__(self)
+            self.selectors = selectors
+            self.open_elements = OpenElements()
+            self.excluded_depth = 0
+
+        def handle_starttag(self, tag, attrs):
+            depth = self.open_elements.start(tag)
+            if self.excluded_depth:
+                if depth >= self.excluded_depth:
+                    return
+                # Closed by a sibling, such as the next li
+                self.excluded_depth = 0
+
+            for selector in self.selectors:
+                if selector_matches(selector, tag, attrs):
+                    if tag not in void_tags:
+                        self.excluded_depth = depth + 1
+                    return
+
+            html2text.HTML2Text.handle_starttag(self, tag, attrs)
+
+        def handle_endtag(self, tag):
+            depth = self.open_elements.end(tag)
+            if self.excluded_depth:
+                if not depth or depth > self.excluded_depth:
+                    return
+                closed_depth = self.excluded_depth
+                self.excluded_depth = 0
+                if depth == closed_depth:
+                    return
+                # Otherwise it closed along with a parent that wasn't excluded
+
+            html2text.HTML2Text.handle_endtag(self, tag)
+
+        def handle_data(self, data, entity_char=False):
+            if self.excluded_depth:
+                return
+
+            html2text.HTML2Text.handle_data(self, data, entity_char)
+
+    excluding_parser_class = ExcludingHTML2Text
+    return excluding_parser_class
+
+class Normalizer(object):
+    """
+    The compiled normalization rules for a url.
+
+    Elements matching exclude rules are dropped while the html is converted to
+    text, then the regex rules are applied in order, scanning once for each
+    run of rules without groups.  Within such a run the leftmost match wins
+    where rules overlap, replacements are literal strings.
+
+    Rules that fail to compile are left out and described in errors.
+    """
+    def __init__(self, rules):
+        self.selectors = []
+        self.errors = []
+        for rule in rules:
+            if rule.kind != 'exclude':
+                continue
+            try:
+                self.selectors.append(parse_selector(rule.pattern))
+            except ValueError as e:
+                self.errors.append('Ignoring exclude rule: {}'.format(e))
+
+        substitutions = []
+        for rule in rules:
+            if rule.kind != 'regex':
+                continue
+            try:
+                re.compile(rule.pattern)
+            except re.error as e:
+                self.errors.append('Ignoring invalid regex rule {}: {}'.format(
+                                                            rule.pattern, e))
+            else:
+                substitutions.append(rule)
+        self.replacements = [rule.replacement or ''
+                                            for rule in substitutions]
+        self.steps = compile_substitutions(rule.pattern
+                                            for rule in substitutions)
+
+    def get_parser(self):
+        """Returns a fresh html2text parser applying the exclude rules"""
+        if self.selectors:
+            return get_excluding_parser_class()(self.selectors)
+
+        import html2text
+        return html2text.HTML2Text()
+
+    def substitute(self, text):
+        for expression, index in self.steps:
+            if index is None:
+                text = expression.sub(lambda m: self.replacements[
+                                int(m.lastgroup[len('wc_rule_'):])], text)
+            else:
+                replacement = self.replacements[index]
+                text = expression.sub(lambda m: replacement, text)
+
+        return text
+
+class Normalizers(object):
+    """
+    Normalization rules keyed by host or url.
+
+    A Normalizer is compiled the first time it is needed and reused for every
+    url on the same host that has no rules of its own.
+    """
+    def __init__(self, rules):
+        self.rules = {}
+        for rule in rules:
+            self.rules.setdefault(rule.target, []).append(
+                            Rule(rule.kind, rule.pattern, rule.replacement))
+        self.compiled = {}
+
+    def for_url(self, url):
+        """
+        Input a check's url.  Returns its Normalizer or None if no rules
+        apply to it.
+        """
+        host = urlparse(url).hostname
+        key = (host, url if url in self.rules else None)
+        if key not in self.compiled:
+            rules = self.rules.get(host, []) + self.rules.get(key[1], [])
+            self.compiled[key] = Normalizer(rules) if rules else None
+
+        return self.compiled[key]
+
+    def take_errors(self, url):
+        """
+        Returns descriptions of the rules for url that were left out because
+        they are invalid, each is only returned once.
+        """
+        normalizer = self.for_url(url)
+        if normalizer is None or not normalizer.errors:
+            return []
+
+        errors = normalizer.errors
+        normalizer.errors = []
+        return errors
+
+def load_normalizers(session):
+    """Returns Normalizers for every stored rule"""
+    return Normalizers(session.query(NormalizationRule).order_by(
+                                                        NormalizationRule.id))
+
+def get_normalizer(session, url):
+    """Returns the Normalizer for a single url or None"""
+    return Normalizers(session.query(NormalizationRule).filter(
+                NormalizationRule.target.in_((url, urlparse(url).hostname)))
+                .order_by(NormalizationRule.id)).for_url(url)
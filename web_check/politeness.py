@@ -0,0 +1,100 @@
+import time
+
+class TokenBucket(object):
+    """
+    Allow rate requests a second with bursts of up to capacity requests.
+
+    A rate of 0 or less disables the limit.
+    """
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = max(capacity, 1)
+        self.tokens = self.capacity
+        self.updated = time.time()
+
+    def acquire(self):
+        """Block until a token is available and take it"""
+        if self.rate <= 0:
+            return
+
+        while True:
+            now = time.time()
+            self.tokens = min(self.capacity,
+                            self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+
+            time.sleep((1 - self.tokens) / self.rate)
+
+class CircuitBreaker(object):
+    """
+    Trips after threshold consecutive connection failures or timeouts.
+
+    While tripped every request is refused until cooldown seconds have passed,
+    then a single probe is let through.  A successful probe closes the breaker,
+    a failed one trips it for another cooldown.  A threshold of 0 or less
+    disables the breaker.
+    """
+    def __init__(self, threshold, cooldown):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.tripped_at = 0
+        self.probing = False
+
+    def allow(self):
+        if self.threshold <= 0 or self.failures < self.threshold:
+            return True
+
+        if self.probing:
+            return False
+
+        if time.time() - self.tripped_at >= self.cooldown:
+            self.probing = True
+            return True
+
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.probing = False
+
+    def release(self):
+        """Let another probe through without counting this request"""
+        self.probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.probing = False
+        if self.threshold > 0 and self.failures >= self.threshold:
+            self.tripped_at = time.time()
+
+class HostPoliteness(object):
+    """
+    Per host token buckets and circuit breakers.
+
+    State is kept for the lifetime of the object so a single instance can be
+    shared between runs in the same process.
+    """
+    def __init__(self, rate, burst, failure_threshold, cooldown):
+        self.rate = rate
+        self.burst = burst
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.buckets = {}
+        self.breakers = {}
+
+    def bucket(self, host):
+        if host not in self.buckets:
+            self.buckets[host] = TokenBucket(self.rate, self.burst)
+
+        return self.buckets[host]
+
+    def breaker(self, host):
+        if host not in self.breakers:
+            self.breakers[host] = CircuitBreaker(self.failure_threshold,
+                                                self.cooldown)
+
+        return self.breakers[host]
@@ -0,0 +1,117 @@
+from html.parser import HTMLParser
+
+from web_check.normalize import parse_selector, selector_matches, void_tags, \
+    OpenElements
+from web_check.text import get_text
+
+sources = ('html', 'text')
+
+class ElementFound(Exception):
+    pass
+
+class ElementFinder(HTMLParser):
+    """
+    Finds the first element matching a selector and records where its
+    contents start and end, parsing stops as soon as it has been closed.  An
+    element whose end tag is left out ends where its next sibling starts or
+    its parent closes.
+    """
+    def __init__(self, selector):
+        HTMLParser.__init__(self, convert_charrefs=False)
+        self.selector = selector
+        self.open_elements = OpenElements()
+        self.depth = 0
+        self.start = None
+        self.end = None
+
+    def handle_starttag(self, tag, attrs):
+        depth = self.open_elements.start(tag)
+        if self.depth:
+            if depth < self.depth:
+                # Closed by a sibling, such as the next li
+                self.end = (self.getpos(), 0)
+                raise ElementFound()
+            return
+
+        if selector_matches(self.selector, tag, attrs):
+            self.start = (self.getpos(), len(self.get_starttag_text()))
+            if tag in void_tags:
+                self.end = self.start
+                raise ElementFound()
+            self.depth = depth + 1
+
+    def handle_endtag(self, tag):
+        depth = self.open_elements.end(tag)
+        if self.depth and depth and depth <= self.depth:
+            self.end = (self.getpos(), 0)
+            raise ElementFound()
+
+def get_offset(html, line_starts, position):
+    """Input a ((line, column), extra) position.  Returns its index in html"""
+    (line, column), extra = position
+    return line_starts[line - 1] + column + extra
+
+def find_element(html, selector):
+    """
+    Input html and a simple css selector.  Returns the html inside the first
+    matching element, the rest of the document if it is never closed or None
+    if nothing matches.
+    """
+    finder = ElementFinder(parse_selector(selector))
+    try:
+        finder.feed(html)
+        finder.close()
+    except ElementFound:
+        pass
+
+    if finder.start is None:
+        return None
+
+    # getpos() only counts \n as a line break, splitlines() would also break
+    # on characters like \x85 that latin-1 pages are full of
+    line_starts = [0]
+    for line in html.split('\n'):
+        line_starts.append(line_starts[-1] + len(line) + 1)
+    start = get_offset(html, line_starts, finder.start)
+    if finder.end is None:
+        return html[start:]
+
+    return html[start:get_offset(html, line_starts, finder.end)]
+
+def get_region(html, start_marker=None, end_marker=None, selector=None,
+            source='html'):
+    """
+    Input html and a RawCheck's scoping options.  Returns the part of the
+    page its expression should run against or None if a marker or the
+    selector isn't found.
+
+    The selector picks an element first, the result is converted to text if
+    source is text and finally cut down to what lies between the markers,
+    which aren't included.  Markers are found with a plain substring search so
+    narrowing the page costs far less than running the expression over it.
+    """
+    region = html
+    if selector:
+        region = find_element(region, selector)
+        if region is None:
+            return None
+
+    if source == 'text':
+        region = get_text(region)
+
+    start = 0
+    if start_marker:
+        start = region.find(start_marker)
+        if start == -1:
+            return None
+        start += len(start_marker)
+
+    end = len(region)
+    if end_marker:
+        end = region.find(end_marker, start)
+        if end == -1:
+            return None
+
+    if start or end != len(region):
+        region = region[start:end]
+    return region
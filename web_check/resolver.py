@@ -0,0 +1,209 @@
+import time
+import socket
+import ipaddress
+import importlib.util
+from contextlib import contextmanager
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+
+# Kept so lookups still reach the system resolver while a cache is installed
+system_getaddrinfo = socket.getaddrinfo
+
+prewarm_workers = 16
+
+def system_resolver(host, port, family=0, type=0, proto=0, flags=0):
+    """
+    Resolve through the system resolver.  Returns (addresses, None) as it
+    doesn't report a ttl.
+    """
+    return (system_getaddrinfo(host, port, family, type, proto, flags), None)
+
+def dnspython_resolver(host, port, family=0, type=0, proto=0, flags=0):
+    """
+    Resolve A and AAAA records with dnspython.  Returns (addresses, ttl) with
+    the addresses in getaddrinfo's format and the lowest ttl of the records.
+
+    Names are looked up in DNS first, so /etc/hosts and nsswitch are only
+    consulted for names DNS can't answer, ip addresses and unusual lookups.
+    """
+    import dns.resolver
+    import dns.exception
+    try:
+        ipaddress.ip_address(host)
+    except ValueError:
+        pass
+    else:
+        return system_resolver(host, port, family, type, proto, flags)
+
+    if flags or type not in (0, socket.SOCK_STREAM) \
+            or not isinstance(port, int):
+        return system_resolver(host, port, family, type, proto, flags)
+
+    queries = []
+    if family in (0, socket.AF_INET):
+        queries.append((socket.AF_INET, 'A'))
+    if family in (0, socket.AF_INET6):
+        queries.append((socket.AF_INET6, 'AAAA'))
+
+    # resolve replaced query in dnspython 2.0
+    resolve = getattr(dns.resolver, 'resolve', None) or dns.resolver.query
+    addresses = []
+    ttl = None
+    for address_family, record_type in queries:
+        try:
+            answer = resolve(host, record_type)
+        except dns.exception.DNSException:
+            continue
+
+        if ttl is None or answer.rrset.ttl < ttl:
+            ttl = answer.rrset.ttl
+        for record in answer:
+            if address_family == socket.AF_INET:
+                address = (record.address, port)
+            else:
+                address = (record.address, port, 0, 0)
+            addresses.append((address_family, socket.SOCK_STREAM,
+                            socket.IPPROTO_TCP, '', address))
+
+    if not addresses:
+        return system_resolver(host, port, family, type, proto, flags)
+
+    return (addresses, ttl)
+
+def get_resolver(record_ttls=False):
+    """
+    Returns system_resolver, or dnspython_resolver if record_ttls is set.
+
+    Reading ttls means asking DNS directly, bypassing /etc/hosts and
+    nsswitch, so it is never chosen just because dnspython is installed.
+    Raises ValueError if record_ttls is set without dnspython.
+    """
+    if not record_ttls:
+        return system_resolver
+
+    if importlib.util.find_spec('dns') is None:
+        raise ValueError('Reading record ttls needs dnspython installed, pip \
+install dnspython')
+
+    return dnspython_resolver
+
+class DNSCache(object):
+    """
+    Caches getaddrinfo results in process so each host is only resolved once
+    while its records are valid.
+
+    resolver is called as getaddrinfo is and returns (addresses, ttl), a ttl
+    of None means the resolver doesn't know it and default_ttl is used.  Ttls
+    are capped at max_ttl and failed lookups are remembered for negative_ttl
+    so a host that doesn't resolve doesn't stall each of its checks in turn.
+    A default_ttl of 0 or less only caches records with a known ttl.
+
+    clock can be replaced along with resolver to test expiry without waiting.
+    """
+    def __init__(self, resolver=None, default_ttl=300, negative_ttl=30,
+                max_ttl=3600, clock=time.time):
+        self.resolver = resolver or system_resolver
+        self.default_ttl = default_ttl
+        self.negative_ttl = negative_ttl
+        self.max_ttl = max_ttl
+        self.clock = clock
+        self.entries = {}
+        self.lookups = 0
+        self.hits = 0
+
+    def getaddrinfo(self, host, port, family=0, type=0, proto=0, flags=0):
+        # Cached for every family and filtered, requests asks for AF_INET
+        # on hosts without ipv6 and the prewarm for any family
+        key = (host, port, type, proto, flags)
+        now = self.clock()
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] > now:
+            self.hits += 1
+            return self.for_family(entry[1], family)
+
+        self.lookups += 1
+        try:
+            addresses, ttl = self.resolver(host, port, 0, type, proto, flags)
+        except socket.gaierror as e:
+            if self.negative_ttl > 0:
+                self.entries[key] = (now + self.negative_ttl, e)
+            raise
+
+        if ttl is None:
+            ttl = self.default_ttl
+        ttl = min(ttl, self.max_ttl)
+        if ttl > 0:
+            self.entries[key] = (now + ttl, list(addresses))
+        else:
+            self.entries.pop(key, None)
+        return self.for_family(addresses, family)
+
+    def for_family(self, result, family):
+        """
+        Input a cached result and the family asked for.  Returns the
+        addresses of that family or raises the failure that was cached.
+        """
+        if isinstance(result, socket.gaierror):
+            raise socket.gaierror(*result.args)
+
+        addresses = [address for address in result
+                                        if family in (0, address[0])]
+        if not addresses:
+            raise socket.gaierror(socket.EAI_NONAME,
+                                'No addresses of the requested family')
+        return addresses
+
+    @contextmanager
+    def installed(self):
+        """
+        Route every getaddrinfo call in the process, including those made by
+        requests, through the cache for the duration of a with block.
+        """
+        previous = socket.getaddrinfo
+        socket.getaddrinfo = self.getaddrinfo
+        try:
+            yield self
+        finally:
+            socket.getaddrinfo = previous
+
+def get_address(url):
+    """Input a url.  Returns its (host, port)"""
+    parsed = urlparse(url)
+    port = parsed.port
+    if port is None:
+        port = 443 if parsed.scheme == 'https' else 80
+    return (parsed.hostname, port)
+
+def prewarm(cache, urls, workers=prewarm_workers):
+    """
+    Input a DNSCache and the urls about to be fetched.  Resolves each distinct
+    host and port once, workers at a time, so checks don't wait on the
+    resolver one after another.  Returns the number of hosts that didn't
+    resolve.
+
+    Only lookups are warmed, fetches don't share connections so connecting
+    ahead of them would add a handshake rather than save one.
+    """
+    addresses = set()
+    for url in urls:
+        try:
+            host, port = get_address(url)
+        except ValueError:
+            # Invalid ports fail when the check is fetched
+            continue
+        if host:
+            addresses.add((host, port))
+
+    def warm(address):
+        host, port = address
+        try:
+            cache.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+        except OSError:
+            return False
+        return True
+
+    if not addresses:
+        return 0
+
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        return list(executor.map(warm, addresses)).count(False)
@@ -0,0 +1,106 @@
+import time
+
+from web_check.models import check_models
+
+# Keeps each IN (...) well under sqlite's limit on bound parameters
+max_id_batch = 500
+
+def get_urgency(run_after, check_frequency, priority, now):
+    """
+    Returns how overdue a check is measured in check_frequency periods and
+    multiplied by its priority, which defaults to 1.  A check that runs hourly
+    and is an hour late is as urgent as a daily one that is a day late.
+    """
+    if priority is None:
+        priority = 1
+    return (now - run_after) / max(check_frequency or 0, 1) * priority
+
+def get_schedule(session, due_before=None, now=None):
+    """
+    Returns (urgency, check_type, id) for every due check of any type, most
+    urgent first.  Only the columns needed to order them are loaded.
+    """
+    if now is None:
+        now = time.time()
+    schedule = []
+    for model in check_models:
+        for row in session.query(model.id, model.run_after,
+                            model.check_frequency, model.priority).filter(
+                                    model.run_after < (due_before or now)):
+            schedule.append((get_urgency(row.run_after, row.check_frequency,
+                                    row.priority, now),
+                            model.check_type, row.id))
+
+    # Stable, so equally urgent checks keep their table and id order
+    schedule.sort(key=lambda entry: -entry[0])
+    return schedule
+
+def iter_scheduled_checks(session, schedule, batch_size):
+    """
+    Input a schedule from get_schedule.  Yields its checks in order, loading
+    them batch_size at a time with one query per check type in each batch.
+
+    As with iter_due_checks each batch is removed from the session once it
+    has been processed.  Checks deleted since the schedule was made are
+    skipped.
+    """
+    models = dict((model.check_type, model) for model in check_models)
+    batch_size = min(max(batch_size, 1), max_id_batch)
+    for start in range(0, len(schedule), batch_size):
+        batch = schedule[start:start + batch_size]
+        ids = {}
+        for urgency, check_type, check_id in batch:
+            ids.setdefault(check_type, []).append(check_id)
+
+        checks = {}
+        for check_type, check_ids in ids.items():
+            model = models[check_type]
+            for check in session.query(model).filter(model.id.in_(check_ids)):
+                checks[(check_type, check.id)] = check
+
+        for urgency, check_type, check_id in batch:
+            check = checks.get((check_type, check_id))
+            if check is not None:
+                yield check
+
+        del checks
+        session.expunge_all()
+
+def get_percentile(values, percentile):
+    """Input sorted values.  Returns the value at percentile, 0 to 100"""
+    return values[int(round(percentile / 100 * (len(values) - 1)))]
+
+class LatenessReport(object):
+    """
+    Collects how many seconds past their run_after checks were started.
+
+    Checks that have never run are counted separately since they have no
+    run_after to be late for.  left_due is set when a time budget stops a run
+    before every due check was started.
+    """
+    def __init__(self):
+        self.lateness = []
+        self.new = 0
+        self.left_due = 0
+
+    def add(self, check, now=None):
+        if not check.run_after:
+            self.new += 1
+            return
+
+        if now is None:
+            now = time.time()
+        self.lateness.append(max(now - check.run_after, 0))
+
+    def summary(self, elapsed):
+        """Returns a one line description of the run"""
+        message = 'Ran {} checks ({} new) in {:.1f}s, {} left due'.format(
+                    len(self.lateness) + self.new, self.new, elapsed,
+                    self.left_due)
+        if not self.lateness:
+            return message
+
+        lateness = sorted(self.lateness)
+        return '{}, lateness median {:.0f}s, 95th percentile {:.0f}s, max \
+{:.0f}s'.format(message, get_percentile(lateness, 50),
+                get_percentile(lateness, 95), lateness[-1])
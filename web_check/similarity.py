@@ -0,0 +1,63 @@
+import hashlib
+
+shingle_size = 3
+simhash_bits = 64
+
+def get_shingles(text, size=shingle_size):
+    """
+    Input extracted text.  Returns the set of runs of size consecutive words,
+    text shorter than that is a single shingle.
+    """
+    words = text.split()
+    if len(words) <= size:
+        return set([' '.join(words)]) if words else set()
+
+    return set(' '.join(words[i:i + size])
+                                for i in range(len(words) - size + 1))
+
+def simhash(text):
+    """
+    Input extracted text.  Returns the 64 bit SimHash of its shingles as a
+    signed integer so it fits a sqlite INTEGER.
+
+    Each bit is set if most shingle hashes have it set, so texts sharing most
+    of their shingles get hashes that differ in only a few bits.  The hashes
+    are laid out as strings of bits and counted a column at a time, which
+    keeps the per shingle work in C.
+    """
+    bits = [format(int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'),
+                                        digest_size=8).digest(), 'big'), '064b')
+                                            for shingle in get_shingles(text)]
+    half = len(bits) / 2
+    value = 0
+    for column in zip(*bits):
+        value <<= 1
+        if column.count('1') > half:
+            value |= 1
+
+    if value >= 2 ** 63:
+        value -= 2 ** 64
+    return value
+
+def similarity(a, b):
+    """
+    Input two simhashes.  Returns 1.0 for identical text falling to 0.0 for
+    unrelated text.
+
+    Unrelated texts already share about half their bits by chance, so the
+    fraction of matching bits is rescaled to put that at 0.
+    """
+    differing = bin((a ^ b) & (2 ** simhash_bits - 1)).count('1')
+    return max(0, 1 - 2 * differing / simhash_bits)
+
+def validate_threshold(threshold):
+    """
+    Returns threshold as a float or raises ValueError unless it is between 0
+    and 1.
+    """
+    threshold = float(threshold)
+    if not 0 < threshold <= 1:
+        raise ValueError('similarity threshold {} given, must be greater than \
+0 and at most 1'.format(threshold))
+
+    return threshold
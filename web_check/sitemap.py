@@ -0,0 +1,227 @@
+import io
+import gzip
+import time
+from urllib.parse import urljoin, urlparse
+from xml.etree import ElementTree
+
+from web_check import events
+from web_check.archive import NotRecorded
+from web_check.blobs import release_content
+from web_check.compare import compare_hash, compare_content, compare_string
+from web_check.models import SitePage
+from web_check.text import get_text
+from web_check.transport import request_url, HostUnavailable, RequestFailed
+
+site_evaluators = ('md5', 'diff', 'string')
+
+def local_name(tag):
+    """Returns an xml tag without its namespace"""
+    return tag.rsplit('}', 1)[-1]
+
+def parse_sitemap(content):
+    """
+    Input the body of a sitemap or sitemap index, gzipped or not.  Returns
+    (is_index, [(loc, lastmod), ...]), lastmod is None where it isn't given.
+
+    The document is parsed incrementally and each entry is discarded once
+    read, so large sitemaps don't build a full tree.  Raises ValueError if it
+    isn't a sitemap.
+    """
+    if content[:2] == b'\x1f\x8b':
+        content = gzip.decompress(content)
+
+    is_index = None
+    entries = []
+    try:
+        for event, element in ElementTree.iterparse(io.BytesIO(content),
+                                                    events=('start', 'end')):
+            tag = local_name(element.tag)
+            if event == 'start':
+                if is_index is None:
+                    if tag not in ('sitemapindex', 'urlset'):
+                        raise ValueError('{} is not a sitemap element'.format(
+                                                                        tag))
+                    is_index = tag == 'sitemapindex'
+                continue
+
+            if tag not in ('url', 'sitemap'):
+                continue
+
+            loc = lastmod = None
+            for child in element:
+                name = local_name(child.tag)
+                if name == 'loc':
+                    loc = (child.text or '').strip()
+                elif name == 'lastmod':
+                    lastmod = (child.text or '').strip() or None
+            if loc:
+                entries.append((loc, lastmod))
+            element.clear()
+    except ElementTree.ParseError as e:
+        raise ValueError('Invalid sitemap: {}'.format(e))
+
+    if is_index is None:
+        raise ValueError('Empty sitemap')
+
+    return (is_index, entries)
+
+def resolve_locs(site, sitemap, entries):
+    """
+    Input a SiteCheck and the entries read from one of its sitemaps.  Returns
+    the entries with each loc resolved against the sitemap's url, locs that
+    don't give an http or https url are reported as errors and left out.
+    """
+    resolved = []
+    for loc, lastmod in entries:
+        url = urljoin(sitemap, loc)
+        try:
+            parsed = urlparse(url)
+            # Raises ValueError for a port that isn't a number
+            parsed.port
+        except ValueError:
+            parsed = None
+        if parsed is None or parsed.scheme not in ('http', 'https') \
+                or not parsed.hostname:
+            events.emit('error', site, page=loc, message='Ignoring invalid \
+location {} in {}'.format(loc, sitemap))
+            continue
+        resolved.append((url, lastmod))
+
+    return resolved
+
+def evaluate_page(session, site, page, url_content, normalizer,
+                hash_algorithm):
+    """
+    Run the site's evaluator against a page that has been fetched.  Returns
+    True if it changed, pages fetched for the first time only have their
+    state recorded.
+    """
+    text = get_text(url_content.text, normalizer)
+    if site.evaluator == 'string':
+        return compare_string(session, site, page, text, page=page.url)
+
+    if site.evaluator == 'diff':
+        return compare_content(session, site, page, text, page=page.url)[0]
+
+    return compare_hash(session, site, page, text, hash_algorithm,
+                    page=page.url)[0]
+
+def sync_pages(session, site, sitemap, entries, hosts, archive, normalizers,
+            hash_algorithm):
+    """
+    Input the entries read from one of a site's sitemaps.  Fetches and
+    evaluates the pages that are new or whose lastmod has changed, pages
+    without a lastmod are always fetched.  Pages no longer listed are
+    removed.  Returns the number of pages that changed.
+    """
+    pages = dict((page.url, page) for page in session.query(SitePage).filter(
+                                    SitePage.site_id == site.id,
+                                    SitePage.sitemap == sitemap,
+                                    SitePage.kind == 'page'))
+    seen = set()
+    changes = 0
+    for url, lastmod in entries:
+        if url in seen:
+            continue
+        seen.add(url)
+        page = pages.pop(url, None)
+        if page is None:
+            page = SitePage(site_id=site.id, sitemap=sitemap, kind='page',
+                        url=url)
+            session.add(page)
+            if site.last_synced:
+                events.emit('page_added', site, page=url)
+        elif lastmod and page.lastmod == lastmod:
+            continue
+
+        try:
+            url_content = request_url(url, site.check_timeout, hosts, archive)
+        except (HostUnavailable, RequestFailed):
+            events.emit('error', site, page=url,
+                        message='Could not connect to {}'.format(url))
+            continue
+        except NotRecorded as e:
+            events.emit('error', site, page=url, message=str(e))
+            continue
+
+        if url_content.status_code != 200:
+            events.emit('error', site, page=url, message='{} code from \
+server for {}'.format(url_content.status_code, url))
+            continue
+
+        changes += evaluate_page(session, site, page, url_content,
+                            normalizers.for_url(url), hash_algorithm)
+        page.lastmod = lastmod
+        session.commit()
+
+    for page in pages.values():
+        events.emit('page_removed', site, page=page.url)
+        session.delete(page)
+    release_content(session, (page.content_hash for page in pages.values()))
+    session.commit()
+    return changes
+
+def check_site(session, site, url_content, hosts, archive, normalizers,
+            hash_algorithm):
+    """
+    Input a SiteCheck and the response for its sitemap.  Brings its pages up
+    to date, child sitemaps of an index are only fetched when their lastmod
+    changes.  Returns the number of pages that changed.
+    """
+    try:
+        is_index, entries = parse_sitemap(url_content.content)
+    except ValueError as e:
+        events.emit('error', site, message='{} for {}'.format(e, site.url))
+        return 0
+    entries = resolve_locs(site, site.url, entries)
+
+    children = dict((child.url, child) for child in session.query(
+                            SitePage).filter(SitePage.site_id == site.id,
+                                        SitePage.sitemap == site.url,
+                                        SitePage.kind == 'sitemap'))
+    if not is_index:
+        changes = sync_pages(session, site, site.url, entries, hosts, archive,
+                        normalizers, hash_algorithm)
+    else:
+        # Pages listed directly by a sitemap that has become an index
+        changes = sync_pages(session, site, site.url, [], hosts, archive,
+                        normalizers, hash_algorithm)
+        for url, lastmod in entries:
+            child = children.pop(url, None)
+            if child is None:
+                child = SitePage(site_id=site.id, sitemap=site.url,
+                            kind='sitemap', url=url)
+                session.add(child)
+            elif lastmod and child.lastmod == lastmod:
+                continue
+
+            try:
+                child_content = request_url(url, site.check_timeout, hosts,
+                                        archive)
+                if child_content.status_code != 200:
+                    raise ValueError('{} code from server'.format(
+                                                child_content.status_code))
+                child_is_index, child_entries = parse_sitemap(
+                                                        child_content.content)
+                if child_is_index:
+                    raise ValueError('Sitemap indexes can\'t be nested')
+            except (HostUnavailable, RequestFailed, NotRecorded,
+                    ValueError) as e:
+                events.emit('error', site, page=url,
+                            message='{} for {}'.format(e, url))
+                continue
+
+            changes += sync_pages(session, site, url,
+                            resolve_locs(site, url, child_entries), hosts,
+                            archive, normalizers, hash_algorithm)
+            child.lastmod = lastmod
+            session.commit()
+
+    for child in children.values():
+        changes += sync_pages(session, site, child.url, [], hosts, archive,
+                        normalizers, hash_algorithm)
+        session.delete(child)
+
+    site.last_synced = int(time.time())
+    session.commit()
+    return changes
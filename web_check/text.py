@@ -0,0 +1,23 @@
+def get_text(html, normalizer=None):
+    """
+    Input html and optionally a Normalizer.  Returns utf-8 markdown without
+    links
+
+    requests.get().text will be used as the input data
+    html2text will be used to remove most of the changing parts of the response
+    links will be ignored since most large sites have dynamic links
+    if you want to closely monitor a basic site it is probably better to hash
+    requests.get().content and not bother stripping the html
+    the normalizer's rules remove anything else that changes on every request
+    """
+    if normalizer is None:
+        import html2text
+        h = html2text.HTML2Text()
+    else:
+        h = normalizer.get_parser()
+    h.ignore_links = True
+    text = h.handle(html)
+    if normalizer is not None:
+        text = normalizer.substitute(text)
+
+    return text
@@ -0,0 +1,57 @@
+import time
+from urllib.parse import urlparse
+
+from web_check.archive import RecordArchive, ReplayArchive
+
+class HostUnavailable(Exception):
+    """Raised instead of requesting a host whose circuit breaker has tripped"""
+
+class RequestFailed(Exception):
+    """
+    Raised when a request can't connect, times out or fails in any other way,
+    elapsed is how many seconds were spent on it.
+    """
+    def __init__(self, message, elapsed):
+        Exception.__init__(self, message)
+        self.elapsed = elapsed
+
+def request_url(url, timeout, hosts, archive=None):
+    """
+    Input a url, a timeout, the HostPoliteness for the run and optionally a
+    RecordArchive or ReplayArchive.  Returns the response whatever its status.
+
+    Requests to a host whose circuit breaker has tripped raise HostUnavailable
+    straight away instead of waiting for the timeout.  Replayed responses skip
+    the rate limit and circuit breaker since they don't touch the host, a url
+    that wasn't recorded raises NotRecorded.
+    """
+    if isinstance(archive, ReplayArchive):
+        return archive.get(url)
+
+    import requests
+    host = urlparse(url).hostname
+    breaker = hosts.breaker(host)
+    if not breaker.allow():
+        raise HostUnavailable(host)
+
+    hosts.bucket(host).acquire()
+    start = time.time()
+    try:
+        url_content = requests.get(url, timeout=timeout)
+    except (requests.exceptions.ConnectionError,
+            requests.exceptions.Timeout) as e:
+        breaker.record_failure()
+        raise RequestFailed(str(e), time.time() - start)
+    except requests.exceptions.RequestException as e:
+        # Invalid urls never reach the host, other errors such as too many
+        # redirects come from a host that answered
+        if isinstance(e, ValueError):
+            breaker.release()
+        else:
+            breaker.record_success()
+        raise RequestFailed(str(e), time.time() - start)
+
+    breaker.record_success()
+    if isinstance(archive, RecordArchive):
+        archive.save(url, url_content)
+    return url_content